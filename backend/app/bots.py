@@ -0,0 +1,41 @@
+"""
+Tell link-preview crawlers, bots and browser prefetches apart from people
+following a link, so they are counted without being recorded as clicks.
+"""
+import re
+from typing import Optional
+from fastapi import Request
+
+# Substrings of user agents of crawlers and link-preview fetchers. Only
+# crawler-specific names: bare brand names also match in-app browsers
+# ("[Pinterest/iOS]", "YandexSearch/") used by people, and those brands'
+# crawlers ("Pinterestbot/", "YandexBot/") are caught by "bot/".
+BOT_USER_AGENTS = [
+    "bot/", "crawler", "spider", "slurp",
+    "facebookexternalhit", "facebookcatalog", "slackbot", "twitterbot",
+    "discordbot", "telegrambot", "whatsapp/2", "linkedinbot", "skypeuripreview",
+    "embedly/", "redditbot", "applebot", "googlebot", "bingbot",
+    "baiduspider", "duckduckbot", "(mastodon/", "iframely/",
+    "outbrain", "vkshare", "w3c_validator", "headlesschrome", "chrome-lighthouse",
+]
+
+# One alternation, so a user agent is scanned once however long the list
+BOT_USER_AGENT_PATTERN = re.compile("|".join(re.escape(token) for token in BOT_USER_AGENTS), re.IGNORECASE)
+
+# Headers browsers send with speculative (prefetch/prerender/preview) loads
+PREFETCH_HEADERS = ("Purpose", "Sec-Purpose", "X-Moz", "X-Purpose")
+PREFETCH_VALUES = ("prefetch", "prerender", "preview")
+
+def is_bot_user_agent(user_agent: Optional[str]) -> bool:
+    return bool(user_agent) and BOT_USER_AGENT_PATTERN.search(user_agent) is not None
+
+def is_prefetch(request: Request) -> bool:
+    for header in PREFETCH_HEADERS:
+        value = request.headers.get(header)
+        if value and any(purpose in value.lower() for purpose in PREFETCH_VALUES):
+            return True
+    return False
+
+def is_automated(request: Request, user_agent: Optional[str]) -> bool:
+    """True for requests that should not count as clicks"""
+    return is_prefetch(request) or is_bot_user_agent(user_agent)
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Depends, Request
+from typing import Dict, Optional
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,22 +12,93 @@ load_dotenv()
 # Database configuration from environment variables or default values
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./shorturl.db")
 
-# Use different connection parameters based on database type
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
+# Optional read replica for stats and listings; unset sends reads to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Seconds after a user's last write during which their reads go to the
+# primary, so they see their own changes despite replication lag
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+
+def make_engine(url: str):
+    # Use different connection parameters based on database type
+    if url.startswith("sqlite"):
+        sqlite_engine = create_engine(
+            url, connect_args={"check_same_thread": False}
+        )
+
+        # SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to
+        @event.listens_for(sqlite_engine, "connect")
+        def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        return sqlite_engine
     # For PostgreSQL or other databases, don't use SQLite-specific options
-    engine = create_engine(DATABASE_URL)
+    return create_engine(url)
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine = make_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
+# JWT subject -> time.monotonic() of their last commit. Kept per worker
+# process, so with several workers a read may still reach the replica
+# unless the load balancer keeps a user on one worker.
+_recent_writes: Dict[str, float] = {}
+
+def request_subject(request: Request) -> Optional[str]:
+    """
+    Subject of the bearer token of a request, without verifying it: it only
+    picks the database to read from, authentication happens separately.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+def record_write(subject: str):
+    now = time.monotonic()
+    _recent_writes[subject] = now
+    if len(_recent_writes) > 10000:
+        for key, written_at in list(_recent_writes.items()):
+            if now - written_at > READ_AFTER_WRITE_SECONDS:
+                _recent_writes.pop(key, None)
+
+def wrote_recently(subject: Optional[str]) -> bool:
+    written_at = _recent_writes.get(subject) if subject else None
+    return written_at is not None and time.monotonic() - written_at < READ_AFTER_WRITE_SECONDS
+
 # Dependency to get DB session
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    if read_engine is not engine:
+        subject = request_subject(request)
+        if subject:
+            event.listen(db, "after_commit", lambda session: record_write(subject))
     try:
         yield db
     finally:
         db.close()
+
+# Dependency to get a DB session for read-only endpoints: the replica,
+# unless the user has just written something. Otherwise it is the request's
+# get_db session, which the auth dependencies already use, so a request never
+# holds two connections from the primary pool.
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    if read_engine is engine or wrote_recently(request_subject(request)):
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
@@ -0,0 +1,100 @@
+"""
+Interning of click dimension strings (user agent, referrer, operating system,
+location) into their lookup tables.
+
+Ids are resolved through an in-process cache so a repeated value costs a dict
+lookup instead of a query. Ids created inside a transaction are only cached
+once it commits, so a rollback cannot leave ids of rows that never existed.
+"""
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query, Session
+
+from .models.models import Click, Location, OperatingSystem, Referrer, UserAgent
+
+# Entries per dimension before the cache is reset; user agents are the
+# high-cardinality one
+DIMENSION_CACHE_SIZE = 50000
+
+_cache: Dict[type, Dict[str, int]] = {
+    UserAgent: {},
+    Referrer: {},
+    OperatingSystem: {},
+    Location: {},
+}
+
+def _insert_ignore(db: Session, model, values: dict):
+    """INSERT that leaves an existing row alone, safe against concurrent inserts"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(model).values(**values).on_conflict_do_nothing(index_elements=["value"])
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model).values(**values).on_conflict_do_nothing(index_elements=["value"])
+    else:
+        if db.query(model.id).filter(model.value == values["value"]).scalar() is None:
+            db.add(model(**values))
+            db.flush()
+        return
+    db.execute(statement)
+
+def intern_value(db: Session, model, value: Optional[str], **extra) -> Optional[int]:
+    """Return the id of value in the dimension table, inserting it if needed"""
+    if value is None:
+        return None
+
+    cache = _cache[model]
+    dimension_id = cache.get(value)
+    if dimension_id is not None:
+        return dimension_id
+
+    dimension_id = db.query(model.id).filter(model.value == value).scalar()
+    if dimension_id is None:
+        _insert_ignore(db, model, {"value": value, **extra})
+        dimension_id = db.query(model.id).filter(model.value == value).scalar()
+        db.info.setdefault("interned_dimensions", []).append((model, value, dimension_id))
+    else:
+        _remember(model, value, dimension_id)
+    return dimension_id
+
+def _remember(model, value: str, dimension_id: int):
+    cache = _cache[model]
+    if len(cache) >= DIMENSION_CACHE_SIZE:
+        cache.clear()
+    cache[value] = dimension_id
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_dimensions(session: Session):
+    for model, value, dimension_id in session.info.pop("interned_dimensions", []):
+        _remember(model, value, dimension_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_dimensions(session: Session):
+    session.info.pop("interned_dimensions", None)
+
+def click_dimension_ids(
+    db: Session,
+    referrer: Optional[str],
+    user_agent: Optional[str],
+    operating_system: Optional[str],
+    location: Optional[str],
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+) -> dict:
+    """Foreign key values for a new Click"""
+    return {
+        "referrer_id": intern_value(db, Referrer, referrer),
+        "user_agent_id": intern_value(db, UserAgent, user_agent),
+        "operating_system_id": intern_value(db, OperatingSystem, operating_system),
+        "location_id": intern_value(db, Location, location, country=country, city=city),
+    }
+
+def with_click_dimensions(query: Query) -> Query:
+    """Outer join the dimension tables to a query selecting from clicks"""
+    return (
+        query
+        .outerjoin(Referrer, Referrer.id == Click.referrer_id)
+        .outerjoin(UserAgent, UserAgent.id == Click.user_agent_id)
+        .outerjoin(OperatingSystem, OperatingSystem.id == Click.operating_system_id)
+        .outerjoin(Location, Location.id == Click.location_id)
+    )
@@ -0,0 +1,101 @@
+"""
+Click enrichment: client IP, user agent parsing and GeoIP lookups.
+
+The user agent parser and the GeoIP reader are expensive to import and open,
+so they are loaded on first use rather than when the app is imported.
+preload() loads them up front, e.g. in a parent process before forking
+workers so the loaded state is shared.
+"""
+import os
+import threading
+from typing import Optional, Tuple
+from fastapi import Request
+
+# Path to the GeoLite2 database
+GEOIP_DB_PATH = os.environ.get("GEOIP_DB_PATH", "/app/GeoLite2-City.mmdb")
+
+_geoip_reader = None
+_geoip_loaded = False
+_geoip_lock = threading.Lock()
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """Get the real client IP address, accounting for reverse proxies"""
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    if forwarded_for:
+        # X-Forwarded-For can contain multiple IPs - the leftmost is the original client
+        return forwarded_for.split(",")[0].strip()
+    # Fall back to the direct client IP if X-Forwarded-For is not present
+    return request.client.host if request.client else None
+
+def parse_user_agent(user_agent_string: str):
+    from user_agents import parse
+
+    return parse(user_agent_string)
+
+def get_operating_system(user_agent_string: Optional[str]) -> str:
+    """Operating system family of a user agent, "Unknown" if it cannot be told"""
+    if not user_agent_string:
+        return "Unknown"
+    try:
+        return parse_user_agent(user_agent_string).os.family
+    except Exception as e:
+        print(f"Error parsing user agent: {e}")
+        return "Unknown"
+
+def get_geoip_reader():
+    """The shared GeoIP reader, opened on first use; None if unavailable"""
+    global _geoip_reader, _geoip_loaded
+    if _geoip_loaded:
+        return _geoip_reader
+
+    with _geoip_lock:
+        if not _geoip_loaded:
+            try:
+                if os.path.exists(GEOIP_DB_PATH):
+                    import geoip2.database
+
+                    # The default mode memory-maps the file, so workers
+                    # forked after preload() share its pages
+                    _geoip_reader = geoip2.database.Reader(GEOIP_DB_PATH)
+            except Exception as e:
+                print(f"Failed to initialize GeoIP database: {e}")
+            _geoip_loaded = True
+    return _geoip_reader
+
+def lookup_location(client_host: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """(location, country, city) of an IP address"""
+    location = "Unknown"
+    country = None
+    city = None
+
+    if not client_host:
+        return location, country, city
+    # Skip localhost or private IPs
+    if client_host == "127.0.0.1" or client_host.startswith("192.168.") or client_host.startswith("10.") or client_host.startswith("172.16."):
+        return location, country, city
+
+    geoip_reader = get_geoip_reader()
+    if geoip_reader is None:
+        return location, country, city
+
+    try:
+        response = geoip_reader.city(client_host)
+        if response.city.name and response.country.name:
+            location = f"{response.city.name}, {response.country.name}"
+            city = response.city.name
+            country = response.country.name
+        elif response.country.name:
+            location = response.country.name
+            country = response.country.name
+    except Exception as e:
+        print(f"Error getting location: {e}")
+    return location, country, city
+
+def preload():
+    """Import the parsers, compile their tables and open the GeoIP database now"""
+    get_geoip_reader()
+    # Parsing once compiles and caches the user agent regex tables
+    parse_user_agent(
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    )
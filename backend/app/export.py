@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy.orm import Session
+
+from .database import ReadSessionLocal
+from .dimensions import with_click_dimensions
+from .models.models import URL, Click, Location, OperatingSystem, Referrer, UserAgent
+
+# Number of rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "columnar": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = [
+    "id",
+    "short_code",
+    "clicked_at",
+    "referrer",
+    "user_agent",
+    "ip_address",
+    "operating_system",
+    "location",
+    "country",
+    "city",
+]
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_click_rows(
+    user_id: Optional[int],
+    url_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    db: Optional[Session] = None,
+) -> Iterator[List[tuple]]:
+    """
+    Yield click rows of a user's links (or of a single link) in chunks, read
+    through a server-side cursor so memory stays bounded by the chunk size
+    rather than the row count.
+
+    Without db the rows are read through a session of their own on the read
+    replica, opened when the first chunk is requested and closed when the
+    last one has been read, so endpoints close their request session before
+    streaming rather than holding it until the download ends. Callers that
+    go on to change the rows, like retention, pass their primary session.
+    """
+    own_session = db is None
+    if own_session:
+        db = ReadSessionLocal()
+    try:
+        query = with_click_dimensions(
+            db.query(
+                Click.id,
+                URL.short_code,
+                Click.clicked_at,
+                Referrer.value,
+                UserAgent.value,
+                Click.ip_address,
+                OperatingSystem.value,
+                Location.value,
+                Location.country,
+                Location.city,
+            )
+            .join(URL, URL.id == Click.url_id)
+        )
+        if user_id is not None:
+            query = query.filter(URL.user_id == user_id)
+        if url_id is not None:
+            query = query.filter(Click.url_id == url_id)
+        if start:
+            query = query.filter(Click.clicked_at >= start)
+        if end:
+            query = query.filter(Click.clicked_at < end)
+        query = query.order_by(Click.id).yield_per(chunk_size)
+
+        yield from _chunks(query, chunk_size)
+    finally:
+        if own_session:
+            db.close()
+
+def export_csv(chunks: Iterator[List[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows([_serialize(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_ndjson(chunks: Iterator[List[tuple]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_serialize, row)))) + "\n"
+            for row in chunk
+        )
+
+def export_columnar(chunks: Iterator[List[tuple]]) -> Iterator[str]:
+    """One JSON object per chunk mapping each column name to its values"""
+    for chunk in chunks:
+        columns = zip(*chunk)
+        yield json.dumps({
+            name: [_serialize(value) for value in values]
+            for name, values in zip(EXPORT_COLUMNS, columns)
+        }) + "\n"
+
+def export_clicks(
+    fmt: str,
+    user_id: int,
+    url_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[str]:
+    chunks = iter_click_rows(user_id, url_id, start, end)
+    if fmt == "csv":
+        return export_csv(chunks)
+    if fmt == "columnar":
+        return export_columnar(chunks)
+    return export_ndjson(chunks)
@@ -0,0 +1,54 @@
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+# Finished jobs are kept in memory for status polling; the oldest are
+# dropped once this many jobs have been tracked
+MAX_TRACKED_JOBS = 1000
+
+class Job:
+    """Progress of a background job, polled by the client that started it"""
+
+    def __init__(self, kind: str, owner_id: int, total: int):
+        self.id = secrets.token_urlsafe(12)
+        self.kind = kind
+        self.owner_id = owner_id
+        self.status = "pending"
+        self.total = total
+        self.processed = 0
+        self.detail: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def start(self):
+        self.status = "running"
+
+    def advance(self, processed: int = 1, **counters: int):
+        self.processed += processed
+        for name, value in counters.items():
+            self.detail[name] = self.detail.get(name, 0) + value
+
+    def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "completed"
+        self.error = error
+        self.finished_at = datetime.utcnow()
+
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+_lock = threading.Lock()
+
+def create_job(kind: str, owner_id: int, total: int) -> Job:
+    job = Job(kind, owner_id, total)
+    with _lock:
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_TRACKED_JOBS:
+            _jobs.popitem(last=False)
+    return job
+
+def get_job(job_id: str, owner_id: int) -> Optional[Job]:
+    job = _jobs.get(job_id)
+    if job is None or job.owner_id != owner_id:
+        return None
+    return job
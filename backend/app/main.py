@@ -1,15 +1,13 @@
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import event
-from .database import engine, Base, get_db
-from .routers import users, auth, urls, redirect, settings, frontend
-from .models.models import SiteSettings, User
-from sqlalchemy.orm import Session
+from .routers import users, auth, urls, redirect, settings, profiler, frontend
+from .partitions import maintain_click_partitions
+from .profiler import profile_requests, profiler as request_profiler
+import asyncio
 import os
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# The schema is created and upgraded by `python -m app.migrate`, not on import
 
 app = FastAPI(title="ShortURL API", description="A URL shortener service API")
 
@@ -28,15 +26,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize site settings if not exists
+# Create upcoming click partitions (PostgreSQL only) while the app runs;
+# the first check happens one interval after startup, app.migrate covers boot
 @app.on_event("startup")
-async def startup_event():
-    db = next(get_db())
-    settings = db.query(SiteSettings).first()
-    if not settings:
-        settings = SiteSettings(registration_enabled=True)
-        db.add(settings)
-        db.commit()
+async def schedule_partition_maintenance():
+    app.state.partition_maintenance = asyncio.create_task(maintain_click_partitions())
+
+# Sampling profiler, only installed when PROFILE_SAMPLE_RATE or PROFILE_HEADER is set
+if request_profiler.enabled:
+    app.middleware("http")(profile_requests)
 
 # Serve static files from the frontend build
 STATIC_DIR = os.environ.get("STATIC_DIR", "/app/static")
@@ -49,6 +47,7 @@ app.include_router(users.router)
 app.include_router(urls.router)
 app.include_router(redirect.router)
 app.include_router(settings.router)
+app.include_router(profiler.router)
 
 # API health check route
 @app.get("/api/health")
@@ -0,0 +1,52 @@
+"""
+Create or upgrade the database schema. Run once per deploy, before starting
+the app servers:
+
+    python -m app.migrate
+
+The app itself no longer touches the schema on import or startup.
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from .database import DATABASE_URL, SessionLocal, engine
+from .models.models import SiteSettings
+from .partitions import ensure_click_partitions
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Schema that Base.metadata.create_all produced on boot before migrations
+# had to be run explicitly
+CREATE_ALL_REVISION = "add_share_token_column"
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+    return config
+
+def migrate():
+    config = alembic_config()
+    inspector = inspect(engine)
+    if inspector.has_table("users") and not inspector.has_table("alembic_version"):
+        # Created by create_all and never migrated
+        command.stamp(config, CREATE_ALL_REVISION)
+    command.upgrade(config, "head")
+
+    with engine.begin() as connection:
+        for name in ensure_click_partitions(connection):
+            print(f"Created partition {name}")
+
+    # Initialize site settings if not exists
+    db = SessionLocal()
+    try:
+        if not db.query(SiteSettings).first():
+            db.add(SiteSettings(registration_enabled=True))
+            db.commit()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
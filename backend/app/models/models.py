@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Boolean, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.associationproxy import association_proxy
 from datetime import datetime
 import secrets
 from app.database import Base
@@ -8,18 +9,32 @@ class URL(Base):
     __tablename__ = "urls"
 
     id = Column(Integer, primary_key=True, index=True)
-    original_url = Column(String, index=True)
+    original_url = Column(String)
     short_code = Column(String, unique=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     share_token = Column(String(64), unique=True, index=True, nullable=True)
+    # Crawler, link-preview and prefetch hits, counted instead of recorded as clicks
+    bot_hits = Column(Integer, nullable=False, default=0, server_default="0")
+    # Redirect status and Cache-Control max-age; None uses the site settings
+    redirect_status_code = Column(Integer, nullable=True)
+    redirect_cache_max_age = Column(Integer, nullable=True)
+    # SHA-256 of the normalized original URL, only set on links created with
+    # deduplicate so each user has at most one such link per destination
+    url_hash = Column(String(64), nullable=True)
     
     user = relationship("User", back_populates="urls")
-    clicks = relationship("Click", back_populates="url", cascade="all, delete-orphan")
+    # Clicks are removed by the database (ON DELETE CASCADE) instead of being
+    # loaded and deleted one by one by the ORM
+    clicks = relationship("Click", back_populates="url", cascade="all, delete-orphan", passive_deletes=True)
     
     def generate_share_token(self):
         """Generate a unique share token for URL stats sharing"""
         return secrets.token_urlsafe(32)
+    
+    __table_args__ = (
+        Index("ix_urls_user_id_url_hash", "user_id", "url_hash", unique=True),
+    )
 
 class User(Base):
     __tablename__ = "users"
@@ -33,26 +48,86 @@ class User(Base):
     
     urls = relationship("URL", back_populates="user", cascade="all, delete-orphan")
 
+# Click dimensions: each distinct string is stored once and clicks refer to
+# it by id (see app/dimensions.py for interning at ingest)
+class UserAgent(Base):
+    __tablename__ = "user_agents"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+
+class Referrer(Base):
+    __tablename__ = "referrers"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+
+class OperatingSystem(Base):
+    __tablename__ = "operating_systems"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+
+class Location(Base):
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)  # "City, Country", "Country" or "Unknown"
+    country = Column(String, nullable=True)
+    city = Column(String, nullable=True)
+
 class Click(Base):
     __tablename__ = "clicks"
 
     id = Column(Integer, primary_key=True, index=True)
-    url_id = Column(Integer, ForeignKey("urls.id"))
+    url_id = Column(Integer, ForeignKey("urls.id", ondelete="CASCADE"))
     clicked_at = Column(DateTime, default=datetime.utcnow)
-    referrer = Column(String, nullable=True)
-    user_agent = Column(String, nullable=True)
     ip_address = Column(String, nullable=True)
-    client_host = Column(String, nullable=True)  # 添加新字段存储客户端主机信息
-    operating_system = Column(String, nullable=True)
-    location = Column(String, nullable=True)
-    country = Column(String, nullable=True)  # 添加国家字段
-    city = Column(String, nullable=True)  # 添加城市字段
+    referrer_id = Column(Integer, ForeignKey("referrers.id"), nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
+    operating_system_id = Column(Integer, ForeignKey("operating_systems.id"), nullable=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)
     
     url = relationship("URL", back_populates="clicks")
+    referrer_ref = relationship("Referrer", lazy="joined")
+    user_agent_ref = relationship("UserAgent", lazy="joined")
+    operating_system_ref = relationship("OperatingSystem", lazy="joined")
+    location_ref = relationship("Location", lazy="joined")
+    
+    # Read-only string views of the dimensions
+    referrer = association_proxy("referrer_ref", "value")
+    user_agent = association_proxy("user_agent_ref", "value")
+    operating_system = association_proxy("operating_system_ref", "value")
+    location = association_proxy("location_ref", "value")
+    country = association_proxy("location_ref", "country")
+    city = association_proxy("location_ref", "city")
+    
+    __table_args__ = (
+        # Serves per-URL click pages keyed on (clicked_at, id) and time range filters
+        Index("ix_clicks_url_id_clicked_at_id", "url_id", "clicked_at", "id"),
+    )
+
+class ClickRollup(Base):
+    """Per-day click counts kept for historical stats once raw clicks are archived"""
+    __tablename__ = "click_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url_id = Column(Integer, ForeignKey("urls.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    dimension = Column(String(32), nullable=False)  # total, referrer, browser, operating_system, location
+    value = Column(String, nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_click_rollups_url_id_day", "url_id", "day"),
+    )
 
 class SiteSettings(Base):
     __tablename__ = "site_settings"
     
     id = Column(Integer, primary_key=True, index=True)
     registration_enabled = Column(Boolean, default=True)
+    redirect_status_code = Column(Integer, nullable=False, default=307, server_default="307")
+    # Seconds browsers and CDNs may cache redirects; 0 sends no Cache-Control
+    redirect_cache_max_age = Column(Integer, nullable=False, default=0, server_default="0")
     last_updated = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from datetime import date, datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Monthly partitions are created this many months ahead of the current one so
+# inserts never fall through to the default partition
+PARTITION_MONTHS_AHEAD = 2
+
+# How often each app worker makes sure the upcoming partitions exist, so
+# they do not depend on app.migrate or app.retention running in time
+PARTITION_CHECK_INTERVAL_SECONDS = float(os.getenv("PARTITION_CHECK_INTERVAL_SECONDS", "21600"))
+
+DEFAULT_PARTITION = "clicks_default"
+
+# pg_advisory_xact_lock key serializing partition changes between processes
+PARTITION_LOCK_KEY = 715_443_001
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"clicks_y{month.year:04d}m{month.month:02d}"
+
+def is_partitioned(connection: Connection) -> bool:
+    """Clicks are natively partitioned on PostgreSQL only"""
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'clicks'"
+    )).scalar())
+
+def list_partitions(connection: Connection) -> List[str]:
+    return [row[0] for row in connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'clicks' ORDER BY c.relname"
+    ))]
+
+def _create_partition(connection: Connection, month: date):
+    connection.execute(text(
+        f"CREATE TABLE {partition_name(month)} PARTITION OF clicks "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+def ensure_click_partitions(connection: Connection, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the monthly partitions for the current and upcoming months, and
+    for any month whose clicks fell through to the default partition.
+
+    PostgreSQL refuses to create a partition for a range the default
+    partition already holds rows of. Those months are created with the
+    default partition detached, their rows moved over, and the default
+    partition attached again, all in the caller's transaction.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    existing = set(list_partitions(connection))
+
+    current = month_start(now or datetime.utcnow())
+    months = {add_months(current, offset) for offset in range(PARTITION_MONTHS_AHEAD + 1)}
+    stranded = set()
+    if DEFAULT_PARTITION in existing:
+        stranded = {month_start(row[0]) for row in connection.execute(text(
+            f"SELECT DISTINCT date_trunc('month', clicked_at) FROM {DEFAULT_PARTITION}"
+        ))}
+    months = sorted(month for month in months | stranded if partition_name(month) not in existing)
+
+    for month in months:
+        if month not in stranded:
+            _create_partition(connection, month)
+    if any(month in stranded for month in months):
+        connection.execute(text(f"ALTER TABLE clicks DETACH PARTITION {DEFAULT_PARTITION}"))
+        for month in months:
+            if month not in stranded:
+                continue
+            _create_partition(connection, month)
+            bounds = {"start": month, "end": add_months(month, 1)}
+            in_month = "clicked_at >= :start AND clicked_at < :end"
+            connection.execute(text(
+                f"INSERT INTO {partition_name(month)} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"
+            ), bounds)
+            connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+        connection.execute(text(f"ALTER TABLE clicks ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return [partition_name(month) for month in months]
+
+def _ensure_partitions_now() -> List[str]:
+    from .database import engine
+
+    with engine.begin() as connection:
+        return ensure_click_partitions(connection)
+
+async def maintain_click_partitions():
+    """Keep creating partitions as months go by, for as long as the app runs"""
+    while True:
+        await asyncio.sleep(PARTITION_CHECK_INTERVAL_SECONDS)
+        try:
+            for name in await asyncio.to_thread(_ensure_partitions_now):
+                print(f"Created partition {name}")
+        except Exception as e:
+            print(f"Error creating click partitions: {e}")
+
+def drop_click_partition(connection: Connection, month: date) -> bool:
+    """Detach and drop a month's partition; returns False if it does not exist"""
+    name = partition_name(month)
+    if name not in list_partitions(connection):
+        return False
+    connection.execute(text(f"ALTER TABLE clicks DETACH PARTITION {name}"))
+    connection.execute(text(f"DROP TABLE {name}"))
+    return True
@@ -0,0 +1,163 @@
+"""
+Opt-in sampling profiler for finding where request time goes.
+
+While at least one sampled request is in flight, a background thread
+snapshots the Python stacks of all busy threads every PROFILE_INTERVAL_MS
+and counts them in memory in folded form ("root;caller;callee count"),
+ready for flamegraph.pl or speedscope. Threads that are only waiting (idle
+workers, the event loop selecting) are not counted.
+
+A stack is filed under the route of a sampled request ("GET /api/urls/{short_code}")
+only when it runs that request's endpoint function. Everything else busy at
+the time (other traffic, middleware and dependencies, background tasks) is
+filed under "other threads". Unsampled requests to the same endpoint that
+run at the same time cannot be told apart and count towards its route.
+
+Requests are sampled at PROFILE_SAMPLE_RATE, optionally restricted to
+PROFILE_ROUTES path prefixes, and always when they carry the PROFILE_HEADER
+header (if one is configured). With neither a rate nor a header the
+middleware is not installed at all.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from fastapi import Request
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ROUTES = [prefix for prefix in os.getenv("PROFILE_ROUTES", "").split(",") if prefix]
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# Distinct stacks kept; samples of new stacks beyond this are counted as dropped
+MAX_STACKS = 20000
+
+# Innermost frames of a thread that is waiting rather than working
+IDLE_FRAMES = {
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("selectors", "select"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+}
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+class SamplingProfiler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        # Sampled requests in flight, by token
+        self._active: Dict[int, Request] = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_HEADER)
+
+    def should_profile(self, request: Request) -> bool:
+        if PROFILE_HEADER and PROFILE_HEADER in request.headers:
+            return True
+        if PROFILE_SAMPLE_RATE <= 0:
+            return False
+        if PROFILE_ROUTES and not any(request.url.path.startswith(prefix) for prefix in PROFILE_ROUTES):
+            return False
+        return random.random() < PROFILE_SAMPLE_RATE
+
+    def label(self, request: Request) -> str:
+        # The route template, known once the request has been routed, groups
+        # requests without one entry per short code
+        path = getattr(request.scope.get("route"), "path", None)
+        if path is None:
+            path = "/" + request.url.path.strip("/").split("/")[0]
+        return f"{request.method} {path}"
+
+    def start(self, request: Request) -> int:
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            self._active[token] = request
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return token
+
+    def stop(self, token: int):
+        with self._lock:
+            self._active.pop(token, None)
+            if not self._active:
+                self._wakeup.clear()
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            self._sample(active, own_id)
+
+    def _endpoints(self, requests: List[Request]) -> Dict[str, str]:
+        """Frame name of each routed request's endpoint -> the request's label"""
+        endpoints = {}
+        for request in requests:
+            endpoint = request.scope.get("endpoint")
+            if endpoint is not None:
+                name = f"{getattr(endpoint, '__module__', '?')}:{getattr(endpoint, '__name__', '?')}"
+                endpoints.setdefault(name, self.label(request))
+        return endpoints
+
+    def _sample(self, requests: List[Request], own_id: int):
+        endpoints = self._endpoints(requests)
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if (frame.f_globals.get("__name__"), frame.f_code.co_name) in IDLE_FRAMES:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            label = next((endpoints[name] for name in names if name in endpoints), "other threads")
+            stack = ";".join([label, *reversed(names)])
+            with self._lock:
+                self.samples += 1
+                if stack in self.stacks or len(self.stacks) < MAX_STACKS:
+                    self.stacks[stack] += 1
+                else:
+                    self.dropped += 1
+
+profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000)
+
+async def profile_requests(request: Request, call_next):
+    """HTTP middleware sampling a share of requests into the profiler"""
+    if not profiler.should_profile(request):
+        return await call_next(request)
+
+    token = profiler.start(request)
+    try:
+        return await call_next(request)
+    finally:
+        profiler.stop(token)
@@ -0,0 +1,90 @@
+"""
+In-process publish/subscribe of click events for the live click feed.
+
+The redirect path publishes from worker threads; subscribers are server-sent
+event streams consuming on the event loop. Each subscriber has a bounded
+buffer and is dropped, rather than slowing anyone down, once it falls that
+far behind. Only subscribers in the same process see an event.
+"""
+import asyncio
+import os
+import threading
+from typing import Dict, Optional, Set
+
+# Events buffered per subscriber before it is considered too slow and dropped
+CLICK_FEED_BUFFER_SIZE = int(os.getenv("CLICK_FEED_BUFFER_SIZE", "256"))
+
+# Marks the end of a subscription that was dropped for falling behind
+DROPPED = object()
+
+class Subscription:
+    def __init__(self, broker: "Broker", topic, maxsize: int):
+        self.broker = broker
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def offer(self, event):
+        """Runs on the subscriber's event loop"""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+            self.broker.unsubscribe(self)
+            # Discard the backlog so the end marker is the next thing read
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(DROPPED)
+
+    async def get(self, timeout: Optional[float] = None):
+        """Next event, DROPPED, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class Broker:
+    def __init__(self, buffer_size: int = CLICK_FEED_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._subscribers: Dict[object, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic) -> Subscription:
+        """Subscribe to a topic; must be called from the consuming event loop"""
+        subscription = Subscription(self, topic, self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def has_subscribers(self, topic) -> bool:
+        return topic in self._subscribers
+
+    def publish(self, topic, event):
+        """Hand an event to every subscriber of topic; safe to call from any thread"""
+        if topic not in self._subscribers:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has been closed
+                self.unsubscribe(subscription)
+
+# Click events keyed by URL id
+click_broker = Broker()
@@ -0,0 +1,115 @@
+"""
+In-process token-bucket rate limiting.
+
+Each route group has its own limit, set as "<requests>/<seconds>" in
+RATE_LIMIT_<GROUP> (e.g. RATE_LIMIT_REDIRECT=120/60); "0" turns a group off
+and RATE_LIMIT_ENABLED=0 turns all of them off. Anonymous routes are limited
+per client IP, authenticated routes per user.
+
+Buckets live in the worker process, so with several workers each one
+enforces the limit separately.
+"""
+import math
+import os
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+
+from . import auth
+from .enrichment import get_client_ip
+from .models.models import User
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+
+# Defaults per group, as "<requests>/<seconds>"
+DEFAULT_LIMITS = {
+    "redirect": "120/60",
+    "create": "30/60",
+    "auth": "10/60",
+}
+
+# How often idle buckets are swept out
+EVICTION_INTERVAL_SECONDS = 60
+
+def parse_limit(value: str) -> Optional[Tuple[int, float]]:
+    """"<requests>/<seconds>" as (requests, seconds); None if disabled"""
+    if not value or value.strip() == "0":
+        return None
+    requests, _, seconds = value.partition("/")
+    return int(requests), float(seconds or 1)
+
+class TokenBucketLimiter:
+    """Buckets holding up to `capacity` tokens, refilled over `period` seconds"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        # key -> (tokens, updated); a bucket left alone for this long is full
+        # again and the same as no bucket at all
+        self.idle_after = period
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._next_eviction = time.monotonic() + EVICTION_INTERVAL_SECONDS
+
+    def hit(self, key: Hashable) -> float:
+        """Take a token for key; 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_eviction:
+                self._evict(now)
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+    def _evict(self, now: float):
+        cutoff = now - self.idle_after
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[1] > cutoff}
+        self._next_eviction = now + EVICTION_INTERVAL_SECONDS
+
+    def __len__(self):
+        return len(self._buckets)
+
+def _load_limiters() -> Dict[str, TokenBucketLimiter]:
+    limiters = {}
+    if not RATE_LIMIT_ENABLED:
+        return limiters
+    for group, default in DEFAULT_LIMITS.items():
+        limit = parse_limit(os.getenv(f"RATE_LIMIT_{group.upper()}", default))
+        if limit:
+            limiters[group] = TokenBucketLimiter(*limit)
+    return limiters
+
+limiters = _load_limiters()
+
+def _check(limiter: TokenBucketLimiter, key: Hashable):
+    retry_after = limiter.hit(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+def rate_limit(group: str, per_user: bool = False):
+    """Route dependency enforcing the limit of a group, per client IP or per user"""
+    limiter = limiters.get(group)
+    if limiter is None:
+        def not_limited():
+            pass
+        return not_limited
+
+    if per_user:
+        # get_current_user is cached per request, so the route's own
+        # dependency on it does not decode the token again
+        def limit_user(current_user: User = Depends(auth.get_current_user)):
+            _check(limiter, current_user.id)
+        return limit_user
+
+    def limit_ip(request: Request):
+        _check(limiter, get_client_ip(request))
+    return limit_ip
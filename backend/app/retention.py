@@ -0,0 +1,102 @@
+"""
+Click retention: archive raw clicks of old months to compressed CSV files,
+keep per-day rollups for historical stats, then drop the raw rows (the whole
+monthly partition on PostgreSQL).
+
+Run periodically, e.g. from cron:
+
+    python -m app.retention --months 12 --archive-dir /var/lib/shorturl/archive
+"""
+import argparse
+import gzip
+import os
+from datetime import date, datetime, time
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from .database import SessionLocal
+from .export import export_csv, iter_click_rows
+from .models.models import Click, ClickRollup
+from .partitions import add_months, month_start, partition_name, is_partitioned, ensure_click_partitions, drop_click_partition
+from .stats import click_aggregates
+
+load_dotenv()
+
+# Months of raw clicks to keep, counting the current month; 0 keeps everything
+CLICK_RETENTION_MONTHS = int(os.getenv("CLICK_RETENTION_MONTHS", "0"))
+CLICK_ARCHIVE_DIR = os.getenv("CLICK_ARCHIVE_DIR", "./archive")
+
+def archive_month(db: Session, month: date, archive_dir: str) -> int:
+    """Archive and remove one month of raw clicks, returning how many were archived"""
+    start = datetime.combine(month, time.min)
+    end = datetime.combine(add_months(month, 1), time.min)
+    in_month = (Click.clicked_at >= start, Click.clicked_at < end)
+
+    archived = db.query(func.count(Click.id)).filter(*in_month).scalar()
+    if archived:
+        # Write the archive before touching the database so a failed run can
+        # simply be repeated
+        path = os.path.join(archive_dir, f"{partition_name(month)}.csv.gz")
+        with gzip.open(path + ".tmp", "wt", newline="") as archive:
+            # Read from the primary: a lagging replica would leave rows out of
+            # the archive that are deleted below
+            for piece in export_csv(iter_click_rows(None, start=start, end=end, db=db)):
+                archive.write(piece)
+        os.replace(path + ".tmp", path)
+
+        db.bulk_save_objects([
+            ClickRollup(url_id=url_id, day=date.fromisoformat(day), dimension=dimension, value=value, count=count)
+            for url_id, day, dimension, value, count in click_aggregates(db, start=start, end=end, by_day=True)
+            if day is not None
+        ])
+
+    connection = db.connection()
+    if not (is_partitioned(connection) and drop_click_partition(connection, month)):
+        # SQLite, or a month that landed in the default partition
+        db.query(Click).filter(*in_month).delete(synchronize_session=False)
+    db.commit()
+    return archived
+
+def apply_retention(db: Session, months: int, archive_dir: str, now: Optional[datetime] = None) -> dict:
+    """Archive every month older than the retention window"""
+    ensure_click_partitions(db.connection(), now)
+    db.commit()
+    if months <= 0:
+        return {}
+
+    cutoff = add_months(month_start(now or datetime.utcnow()), -(months - 1))
+    oldest = db.query(func.min(Click.clicked_at)).scalar()
+    if oldest is None:
+        return {}
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = {}
+    month = month_start(oldest)
+    while month < cutoff:
+        archived[month.isoformat()] = archive_month(db, month, archive_dir)
+        month = add_months(month, 1)
+    return archived
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and drop old click data")
+    parser.add_argument("--months", type=int, default=CLICK_RETENTION_MONTHS,
+                        help="months of raw clicks to keep, including the current one (0 keeps everything)")
+    parser.add_argument("--archive-dir", default=CLICK_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        archived = apply_retention(db, args.months, args.archive_dir)
+    finally:
+        db.close()
+
+    archived = {month: count for month, count in archived.items() if count}
+    for month, count in archived.items():
+        print(f"Archived {count} clicks from {month[:7]}")
+    if not archived:
+        print("Nothing to archive")
+
+if __name__ == "__main__":
+    main()
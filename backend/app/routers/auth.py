@@ -4,11 +4,12 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from .. import auth
 from ..database import get_db
+from ..ratelimit import rate_limit
 from ..schemas.schemas import Token
 
 router = APIRouter(tags=["authentication"], prefix="/api")
 
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(rate_limit("auth"))])
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from .. import auth
+from ..models.models import User
+from ..profiler import PROFILE_HEADER, PROFILE_ROUTES, PROFILE_SAMPLE_RATE, profiler
+from .settings import check_is_admin
+
+router = APIRouter(
+    prefix="/api/profiler",
+    tags=["profiler"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/stacks", response_class=PlainTextResponse)
+def read_stacks(current_user: User = Depends(auth.get_current_user)):
+    """Sampled stacks in folded format, one "frame;frame;... count" per line"""
+    check_is_admin(current_user)
+    return profiler.folded()
+
+@router.get("/")
+def read_profiler_status(current_user: User = Depends(auth.get_current_user)):
+    """Profiler configuration and sample counts"""
+    check_is_admin(current_user)
+    return {
+        "enabled": profiler.enabled,
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "routes": PROFILE_ROUTES,
+        "header": PROFILE_HEADER or None,
+        "interval_ms": profiler.interval * 1000,
+        "samples": profiler.samples,
+        "dropped_samples": profiler.dropped,
+        "distinct_stacks": len(profiler.stacks),
+    }
+
+@router.delete("/stacks", status_code=status.HTTP_204_NO_CONTENT)
+def reset_stacks(current_user: User = Depends(auth.get_current_user)):
+    """Discard the stacks collected so far"""
+    check_is_admin(current_user)
+    profiler.reset()
@@ -3,25 +3,36 @@ from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..database import get_db
+from ..bots import is_automated
 from ..models.models import URL, Click
-from user_agents import parse as ua_parse
-import geoip2.database
-import os
-
-# Path to the GeoLite2 database
-GEOIP_DB_PATH = os.environ.get("GEOIP_DB_PATH", "/app/GeoLite2-City.mmdb")
-geoip_reader = None
-
-# Try to initialize the GeoIP reader
-try:
-    if os.path.exists(GEOIP_DB_PATH):
-        geoip_reader = geoip2.database.Reader(GEOIP_DB_PATH)
-except Exception as e:
-    print(f"Failed to initialize GeoIP database: {e}")
+from ..dimensions import click_dimension_ids
+from ..pubsub import click_broker
+from ..ratelimit import rate_limit
+from .settings import get_cached_site_settings
+from ..enrichment import get_client_ip, get_operating_system, lookup_location
 
 router = APIRouter(tags=["redirect"], prefix="/r")
 
-@router.get("/{short_code}")
+def build_redirect(
+    db: Session,
+    original_url: str,
+    status_code: Optional[int],
+    cache_max_age: Optional[int]
+) -> RedirectResponse:
+    """Redirect with the link's own status and caching, or the site defaults"""
+    site_settings = get_cached_site_settings(db)
+    if status_code is None:
+        status_code = site_settings["redirect_status_code"]
+    if cache_max_age is None:
+        cache_max_age = site_settings["redirect_cache_max_age"]
+    
+    response = RedirectResponse(url=original_url, status_code=status_code)
+    if cache_max_age:
+        # Lets browsers and CDNs answer repeat visits, which are then not counted
+        response.headers["Cache-Control"] = f"public, max-age={cache_max_age}"
+    return response
+
+@router.get("/{short_code}", dependencies=[Depends(rate_limit("redirect"))])
 def redirect_to_url(
     short_code: str, 
     request: Request, 
@@ -32,60 +43,64 @@ def redirect_to_url(
     db_url = db.query(URL).filter(URL.short_code == short_code).first()
     if db_url is None:
         raise HTTPException(status_code=404, detail="URL not found")
+    response = build_redirect(db, db_url.original_url, db_url.redirect_status_code, db_url.redirect_cache_max_age)
     
-    # Parse user agent to get operating system and browser
-    operating_system = "Unknown"
-    if user_agent:
-        try:
-            parsed_ua = ua_parse(user_agent)
-            operating_system = parsed_ua.os.family
-        except Exception as e:
-            print(f"Error parsing user agent: {e}")
+    # Crawlers and prefetches only bump a counter: no enrichment, no click row
+    if is_automated(request, user_agent):
+        db.query(URL).filter(URL.id == db_url.id).update(
+            {URL.bot_hits: URL.bot_hits + 1}, synchronize_session=False
+        )
+        db.commit()
+        return response
     
-    # Get location from IP address
-    location = "Unknown"
-    country = None
-    city = None
+    # Parse user agent to get operating system
+    operating_system = get_operating_system(user_agent)
     
-    # Get the real client IP address, accounting for reverse proxies
-    client_host = None
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        # X-Forwarded-For can contain multiple IPs - the leftmost is the original client
-        client_host = forwarded_for.split(",")[0].strip()
-    else:
-        # Fall back to the direct client IP if X-Forwarded-For is not present
-        client_host = request.client.host if request.client else None
-    
-    if client_host and geoip_reader:
-        try:
-            # Skip localhost or private IPs
-            if not (client_host == "127.0.0.1" or client_host.startswith("192.168.") or client_host.startswith("10.") or client_host.startswith("172.16.")):
-                response = geoip_reader.city(client_host)
-                if response.city.name and response.country.name:
-                    location = f"{response.city.name}, {response.country.name}"
-                    city = response.city.name
-                    country = response.country.name
-                elif response.country.name:
-                    location = response.country.name
-                    country = response.country.name
-        except Exception as e:
-            print(f"Error getting location: {e}")
+    # Get location from the real client IP address
+    client_host = get_client_ip(request)
+    location, country, city = lookup_location(client_host)
     
     # Record the click
     click = Click(
         url_id=db_url.id,
-        referrer=referer,
-        user_agent=user_agent,
         ip_address=client_host,
-        client_host=client_host,  # 存储客户端主机信息
-        operating_system=operating_system,
-        location=location,
-        country=country,
-        city=city
+        **click_dimension_ids(
+            db,
+            referrer=referer,
+            user_agent=user_agent,
+            operating_system=operating_system,
+            location=location,
+            country=country,
+            city=city
+        )
     )
     db.add(click)
+    db.flush()
+    
+    # Feed live click streams of this URL, if anyone is watching
+    live_event = None
+    if click_broker.has_subscribers(db_url.id):
+        live_event = {
+            "id": click.id,
+            "clicked_at": click.clicked_at.isoformat(),
+            "referrer": referer,
+            "operating_system": operating_system,
+            "location": location,
+            "country": country
+        }
     db.commit()
+    if live_event:
+        click_broker.publish(db_url.id, live_event)
     
     # Redirect to the original URL
-    return RedirectResponse(url=db_url.original_url)
+    return response
+
+@router.head("/{short_code}", dependencies=[Depends(rate_limit("redirect"))])
+def head_url(short_code: str, db: Session = Depends(get_db)):
+    """Answer HEAD with the redirect only: no click, no enrichment"""
+    row = db.query(URL.original_url, URL.redirect_status_code, URL.redirect_cache_max_age).filter(
+        URL.short_code == short_code
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="URL not found")
+    return build_redirect(db, *row)
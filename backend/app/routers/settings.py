@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+import os
+import time
 from .. import auth
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.models import SiteSettings, User
 from ..schemas.site_settings import SiteSettings as SiteSettingsSchema, SiteSettingsUpdate
 
@@ -21,6 +23,34 @@ def get_site_settings(db: Session):
         db.refresh(settings)
     return settings
 
+# Seconds the redirect path reuses site settings before reading them again;
+# other workers see changes after at most this long
+SITE_SETTINGS_CACHE_SECONDS = float(os.getenv("SITE_SETTINGS_CACHE_SECONDS", "30"))
+
+# (expires, values), swapped as one object so readers never see a mix
+_cached_settings = (0.0, None)
+
+def get_cached_site_settings(db: Session) -> dict:
+    """Site settings as a plain dict, read from the database at most every SITE_SETTINGS_CACHE_SECONDS"""
+    global _cached_settings
+    now = time.monotonic()
+    expires, values = _cached_settings
+    if values is not None and now < expires:
+        return values
+
+    settings = get_site_settings(db)
+    values = {
+        "registration_enabled": settings.registration_enabled,
+        "redirect_status_code": settings.redirect_status_code,
+        "redirect_cache_max_age": settings.redirect_cache_max_age,
+    }
+    _cached_settings = (now + SITE_SETTINGS_CACHE_SECONDS, values)
+    return values
+
+def invalidate_site_settings_cache():
+    global _cached_settings
+    _cached_settings = (0.0, None)
+
 def check_is_admin(user: User):
     """Check if user is admin, raise exception if not"""
     if not user.is_admin:
@@ -30,9 +60,10 @@ def check_is_admin(user: User):
         )
 
 @router.get("/", response_model=SiteSettingsSchema)
-def read_settings(db: Session = Depends(get_db)):
+def read_settings(db: Session = Depends(get_read_db), primary_db: Session = Depends(get_db)):
     """Get current site settings"""
-    return get_site_settings(db)
+    # A missing row is created on the primary, never on a read replica
+    return db.query(SiteSettings).first() or get_site_settings(primary_db)
 
 @router.patch("/", response_model=SiteSettingsSchema)
 def update_settings(
@@ -47,7 +78,12 @@ def update_settings(
     
     if settings_update.registration_enabled is not None:
         db_settings.registration_enabled = settings_update.registration_enabled
+    if settings_update.redirect_status_code is not None:
+        db_settings.redirect_status_code = settings_update.redirect_status_code
+    if settings_update.redirect_cache_max_age is not None:
+        db_settings.redirect_cache_max_age = settings_update.redirect_cache_max_age
     
     db.commit()
+    invalidate_site_settings_cache()
     db.refresh(db_settings)
     return db_settings
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, or_, and_
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional, Union
 from .. import auth
-from ..database import get_db
+from ..export import EXPORT_FORMATS, export_clicks
+from ..pubsub import DROPPED, click_broker
+from ..ratelimit import rate_limit
+from ..url_hash import hash_url
+from ..stats import archived_click_counts, build_stats, click_aggregates, rollup_aggregates
+from ..database import get_db, get_read_db, SessionLocal
+from ..jobs import Job, create_job, get_job
 from ..models.models import URL, Click, User
-from ..schemas.schemas import URLCreate, URL as URLSchema, URLDetail, URLStats
+from ..schemas.schemas import URLCreate, URLUpdate, URL as URLSchema, URLDetail, URLStats, URLBulkDelete, Job as JobSchema
+import base64
+import json
 import random
 import string
+import time
 from datetime import datetime, timedelta
-from collections import Counter, defaultdict
-from user_agents import parse as parse_ua
+from itertools import chain
 
 router = APIRouter(
     prefix="/api/urls",
@@ -18,14 +28,36 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Maximum number of clicks removed per DELETE statement in bulk deletion
+BULK_DELETE_CHUNK_SIZE = 10000
+
+# Seconds without events before a live click feed sends a keep-alive comment
+LIVE_FEED_HEARTBEAT_SECONDS = 15
+
 # Function to generate short code
 def generate_short_code(length=6):
     chars = string.ascii_letters + string.digits
     return ''.join(random.choice(chars) for _ in range(length))
 
-@router.post("/", response_model=URLSchema)
+def find_deduplicated_url(db: Session, user_id: int, url_hash: str) -> Optional[URL]:
+    db_url = db.query(URL).filter(URL.user_id == user_id, URL.url_hash == url_hash).first()
+    if db_url is not None:
+        click_count = db.query(func.count(Click.id)).filter(Click.url_id == db_url.id).scalar()
+        setattr(db_url, 'click_count', click_count + archived_click_counts(db, [db_url.id]).get(db_url.id, 0))
+    return db_url
+
+@router.post("/", response_model=URLSchema, dependencies=[Depends(rate_limit("create", per_user=True))])
 def create_url(url: URLCreate, db: Session = Depends(get_db), current_user: User = Depends(auth.get_current_user)):
-    """Create a new shortened URL"""
+    """
+    Create a new shortened URL. With deduplicate, a link this user already
+    created with deduplicate for the same normalized URL is returned instead.
+    """
+    url_hash = hash_url(url.original_url) if url.deduplicate else None
+    if url_hash:
+        db_url = find_deduplicated_url(db, current_user.id, url_hash)
+        if db_url is not None:
+            return db_url
+    
     # Generate a unique short code
     while True:
         short_code = generate_short_code()
@@ -33,9 +65,24 @@ def create_url(url: URLCreate, db: Session = Depends(get_db), current_user: User
         if db_url is None:
             break
     
-    db_url = URL(original_url=url.original_url, short_code=short_code, user_id=current_user.id)
+    db_url = URL(
+        original_url=url.original_url,
+        short_code=short_code,
+        user_id=current_user.id,
+        redirect_status_code=url.redirect_status_code,
+        redirect_cache_max_age=url.redirect_cache_max_age,
+        url_hash=url_hash
+    )
     db.add(db_url)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # A concurrent request created the same deduplicated link first
+        existing = find_deduplicated_url(db, current_user.id, url_hash) if url_hash else None
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_url)
     
     # Add click_count to match schema
@@ -43,7 +90,7 @@ def create_url(url: URLCreate, db: Session = Depends(get_db), current_user: User
     
     return db_url
 
-@router.post("/{short_code}/share", response_model=dict)
+@router.post("/{short_code}/share", response_model=dict, dependencies=[Depends(rate_limit("create", per_user=True))])
 def create_share_link(short_code: str, db: Session = Depends(get_db), current_user: User = Depends(auth.get_current_user)):
     """Create or refresh a share token for a URL"""
     db_url = db.query(URL).filter(URL.short_code == short_code, URL.user_id == current_user.id).first()
@@ -58,25 +105,103 @@ def create_share_link(short_code: str, db: Session = Depends(get_db), current_us
     return {"share_token": share_token}
 
 @router.get("/", response_model=List[URLSchema])
-def read_urls(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(auth.get_current_user)):
+def read_urls(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db), current_user: User = Depends(auth.get_current_user)):
     urls = db.query(URL).filter(URL.user_id == current_user.id).offset(skip).limit(limit).all()
     
-    # Add click count to each URL
+    # Add click count to each URL, including clicks archived into rollups
+    archived = archived_click_counts(db, [url.id for url in urls])
     for url in urls:
         click_count = db.query(func.count(Click.id)).filter(Click.url_id == url.id).scalar()
-        setattr(url, 'click_count', click_count)
+        setattr(url, 'click_count', click_count + archived.get(url.id, 0))
     
     return urls
 
+def encode_click_cursor(click: Click) -> str:
+    """Encode the (clicked_at, id) keyset position of a click as an opaque cursor"""
+    raw = f"{click.clicked_at.isoformat()}|{click.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_click_cursor(cursor: str):
+    try:
+        clicked_at, click_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(clicked_at), int(click_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid clicks cursor")
+
 @router.get("/{short_code}", response_model=URLDetail)
-def read_url(short_code: str, db: Session = Depends(get_db), current_user: User = Depends(auth.get_current_user)):
+def read_url(
+    short_code: str,
+    include_clicks: bool = False,
+    clicks_limit: int = Query(100, ge=1, le=1000),
+    clicks_cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(auth.get_current_user)
+):
+    """
+    Get a URL with its click count. Clicks are only embedded when
+    include_clicks is set, newest first, one page of clicks_limit rows at a
+    time; pass next_clicks_cursor back as clicks_cursor for the next page.
+    """
+    db_url = db.query(URL).filter(URL.short_code == short_code, URL.user_id == current_user.id).first()
+    if db_url is None:
+        raise HTTPException(status_code=404, detail="URL not found")
+    
+    # Add click count, including clicks archived into rollups
+    click_count = db.query(func.count(Click.id)).filter(Click.url_id == db_url.id).scalar()
+    click_count += archived_click_counts(db, [db_url.id]).get(db_url.id, 0)
+    
+    url_detail = {
+        "id": db_url.id,
+        "original_url": db_url.original_url,
+        "short_code": db_url.short_code,
+        "created_at": db_url.created_at,
+        "user_id": db_url.user_id,
+        "click_count": click_count,
+        "redirect_status_code": db_url.redirect_status_code,
+        "redirect_cache_max_age": db_url.redirect_cache_max_age,
+        "clicks": [],
+        "next_clicks_cursor": None
+    }
+    if not include_clicks:
+        return url_detail
+    
+    # Load one bounded page with a keyset on (clicked_at, id) rather than
+    # through the URL.clicks relationship, which would load every click
+    query = db.query(Click).filter(Click.url_id == db_url.id)
+    if clicks_cursor:
+        cursor_clicked_at, cursor_id = decode_click_cursor(clicks_cursor)
+        query = query.filter(or_(
+            Click.clicked_at < cursor_clicked_at,
+            and_(Click.clicked_at == cursor_clicked_at, Click.id < cursor_id)
+        ))
+    clicks = query.order_by(desc(Click.clicked_at), desc(Click.id)).limit(clicks_limit + 1).all()
+    
+    if len(clicks) > clicks_limit:
+        clicks = clicks[:clicks_limit]
+        url_detail["next_clicks_cursor"] = encode_click_cursor(clicks[-1])
+    url_detail["clicks"] = clicks
+    
+    return url_detail
+
+@router.patch("/{short_code}", response_model=URLSchema)
+def update_url(
+    short_code: str,
+    url_update: URLUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth.get_current_user)
+):
+    """Change the redirect status or caching of a URL; null restores the site default"""
     db_url = db.query(URL).filter(URL.short_code == short_code, URL.user_id == current_user.id).first()
     if db_url is None:
         raise HTTPException(status_code=404, detail="URL not found")
     
-    # Add click count
+    for field, value in url_update.dict(exclude_unset=True).items():
+        setattr(db_url, field, value)
+    db.commit()
+    db.refresh(db_url)
+    
     click_count = db.query(func.count(Click.id)).filter(Click.url_id == db_url.id).scalar()
-    setattr(db_url, 'click_count', click_count)
+    setattr(db_url, 'click_count', click_count + archived_click_counts(db, [db_url.id]).get(db_url.id, 0))
     
     return db_url
 
@@ -90,13 +215,85 @@ def delete_url(short_code: str, db: Session = Depends(get_db), current_user: Use
     db.commit()
     return Response(status_code=204)
 
-@router.get("/{short_code}/stats", response_model=URLStats)
-def get_url_stats(
-    short_code: str, 
-    share_token: Optional[str] = None,
-    db: Session = Depends(get_db), 
-    current_user: Optional[User] = Depends(auth.get_current_user_optional)
+def bulk_delete_urls(job: Job, user_id: int, short_codes: List[str]):
+    """
+    Delete the user's URLs one at a time, removing their clicks in bounded
+    chunks first so no single statement holds locks for the whole click log.
+    """
+    job.start()
+    db = SessionLocal()
+    try:
+        for short_code in short_codes:
+            url_id = db.query(URL.id).filter(URL.short_code == short_code, URL.user_id == user_id).scalar()
+            if url_id is None:
+                job.advance(not_found=1)
+                continue
+            
+            while True:
+                click_ids = [row.id for row in db.query(Click.id).filter(Click.url_id == url_id).limit(BULK_DELETE_CHUNK_SIZE)]
+                if not click_ids:
+                    break
+                db.query(Click).filter(Click.id.in_(click_ids)).delete(synchronize_session=False)
+                db.commit()
+                job.advance(0, clicks_deleted=len(click_ids))
+            
+            db.query(URL).filter(URL.id == url_id).delete(synchronize_session=False)
+            db.commit()
+            job.advance(deleted=1)
+        job.finish()
+    except Exception as e:
+        db.rollback()
+        job.finish(error=str(e))
+    finally:
+        db.close()
+
+@router.post("/bulk-delete", response_model=JobSchema, status_code=202,
+             dependencies=[Depends(rate_limit("create", per_user=True))])
+def start_bulk_delete(
+    bulk_delete: URLBulkDelete,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(auth.get_current_user)
+):
+    """Start deleting many URLs in the background; poll the returned job for progress"""
+    short_codes = list(dict.fromkeys(bulk_delete.short_codes))
+    job = create_job("bulk_delete", current_user.id, len(short_codes))
+    # The task keeps the job itself: it may be evicted from the tracked
+    # jobs before the task starts
+    background_tasks.add_task(bulk_delete_urls, job, current_user.id, short_codes)
+    return job
+
+@router.get("/bulk-delete/{job_id}", response_model=JobSchema)
+def read_bulk_delete(job_id: str, current_user: User = Depends(auth.get_current_user)):
+    job = get_job(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{short_code}/clicks/export")
+def export_url_clicks(
+    short_code: str,
+    format: str = Query("csv", regex="^(csv|ndjson|columnar)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth.get_current_user)
 ):
+    """Stream the raw click log of a URL as CSV, NDJSON or columnar JSON chunks"""
+    url_id = db.query(URL.id).filter(URL.short_code == short_code, URL.user_id == current_user.id).scalar()
+    if url_id is None:
+        raise HTTPException(status_code=404, detail="URL not found")
+    # Dependencies are torn down only after the response has been sent; the
+    # export reads through its own session, so release this one now
+    db.close()
+    
+    return StreamingResponse(
+        export_clicks(format, current_user.id, url_id, start, end),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="clicks-{short_code}.{format}"'}
+    )
+
+def get_url_for_stats(db: Session, short_code: str, share_token: Optional[str], current_user: Optional[User]) -> URL:
+    """Resolve a URL for stats access, either by share token or by ownership"""
     # Check if accessing with share token
     if share_token:
         db_url = db.query(URL).filter(URL.short_code == short_code, URL.share_token == share_token).first()
@@ -110,82 +307,96 @@ def get_url_stats(
         db_url = db.query(URL).filter(URL.short_code == short_code, URL.user_id == current_user.id).first()
         if not db_url:
             raise HTTPException(status_code=404, detail="URL not found")
+    return db_url
+
+@router.get("/{short_code}/stats", response_model=URLStats)
+def get_url_stats(
+    short_code: str, 
+    share_token: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_read_db), 
+    current_user: Optional[User] = Depends(auth.get_current_user_optional)
+):
+    db_url = get_url_for_stats(db, short_code, share_token, current_user)
     
-    # Get all clicks for this URL
-    clicks = db.query(Click).filter(Click.url_id == db_url.id).all()
-    
-    # Count total clicks
-    total_clicks = len(clicks)
-    
-    # Analyze referrers
-    referrers = Counter([click.referrer or "Direct/Unknown" for click in clicks])
-    
-    # Analyze browsers from user agents using user-agents library
-    browser_names = []
-    for click in clicks:
-        if not click.user_agent:
-            browser_names.append("Unknown")
-            continue
-        
-        try:
-            user_agent = parse_ua(click.user_agent)
-            browser_family = user_agent.browser.family
-            
-            # Clean up browser family names for better readability
-            if browser_family == "Chrome Mobile":
-                browser_family = "Chrome (Mobile)"
-            elif browser_family == "Firefox Mobile":
-                browser_family = "Firefox (Mobile)"
-            elif browser_family == "Mobile Safari":
-                browser_family = "Safari (Mobile)"
-            
-            browser_names.append(browser_family)
-        except Exception:
-            # Fallback to basic detection if the library fails
-            ua_lower = click.user_agent.lower()
-            
-            if "chrome" in ua_lower and "chromium" not in ua_lower and "edg" not in ua_lower and "opera" not in ua_lower and "opr" not in ua_lower:
-                browser_names.append("Chrome")
-            elif "firefox" in ua_lower:
-                browser_names.append("Firefox")
-            elif "safari" in ua_lower and "chrome" not in ua_lower:
-                browser_names.append("Safari")
-            elif "edg" in ua_lower:
-                browser_names.append("Edge")
-            elif "opera" in ua_lower or "opr" in ua_lower:
-                browser_names.append("Opera")
-            elif "msie" in ua_lower or "trident" in ua_lower:
-                browser_names.append("Internet Explorer")
-            elif "chromium" in ua_lower:
-                browser_names.append("Chromium")
-            else:
-                browser_names.append("Other")
-            
-    browsers = Counter(browser_names)
-    
-    # Analyze operating systems
-    operating_systems = Counter([click.operating_system or "Unknown" for click in clicks])
-    
-    # Analyze locations
-    locations = Counter([click.location or "Unknown" for click in clicks])
-    
-    # Analyze clicks over time (by day)
-    clicks_by_date = defaultdict(int)
-    for click in clicks:
-        date_str = click.clicked_at.strftime('%Y-%m-%d')
-        clicks_by_date[date_str] += 1
-    
-    # Sort clicks by date
-    clicks_over_time = dict(sorted(clicks_by_date.items()))
+    # Live clicks are aggregated in the database; archived months come from rollups
+    stats = build_stats(chain(
+        click_aggregates(db, db_url.id, start, end),
+        rollup_aggregates(db, db_url.id, start, end)
+    ))
     
     return {
         "url_id": db_url.id,
         "short_code": db_url.short_code,
         "original_url": db_url.original_url,
-        "total_clicks": total_clicks,
-        "referrers": dict(referrers),
-        "browsers": dict(browsers),
-        "operating_systems": dict(operating_systems),
-        "locations": dict(locations),
-        "clicks_over_time": clicks_over_time
+        "bot_hits": db_url.bot_hits,
+        **stats
     }
+
+async def live_click_events(request: Request, url_id: int, mode: str):
+    """
+    Server-sent events for new clicks of a URL: one "click" event per click,
+    or in deltas mode one "delta" event per second that saw clicks.
+    """
+    subscription = click_broker.subscribe(url_id)
+    try:
+        yield "retry: 5000\n\n"
+        idle = 0.0
+        window_clicks = 0
+        window_start = time.monotonic()
+        while True:
+            timeout = 1.0 if mode == "deltas" else LIVE_FEED_HEARTBEAT_SECONDS
+            event = await subscription.get(timeout)
+            if await request.is_disconnected():
+                break
+            
+            if event is DROPPED:
+                yield "event: dropped\ndata: {}\n\n"
+                break
+            
+            if event is not None:
+                idle = 0.0
+                if mode == "events":
+                    yield f"event: click\nid: {event['id']}\ndata: {json.dumps(event)}\n\n"
+                else:
+                    window_clicks += 1
+            else:
+                idle += timeout
+            
+            now = time.monotonic()
+            if mode == "deltas" and now - window_start >= 1.0:
+                if window_clicks:
+                    idle = 0.0
+                    delta = {"at": datetime.utcnow().replace(microsecond=0).isoformat(), "clicks": window_clicks}
+                    yield f"event: delta\ndata: {json.dumps(delta)}\n\n"
+                window_clicks = 0
+                window_start = now
+            
+            # Comment lines keep proxies from closing an idle stream
+            if idle >= LIVE_FEED_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+@router.get("/{short_code}/live")
+def live_clicks(
+    short_code: str,
+    request: Request,
+    share_token: Optional[str] = None,
+    mode: str = Query("events", regex="^(events|deltas)$"),
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(auth.get_current_user_optional)
+):
+    """Stream new clicks of a URL as server-sent events instead of polling stats"""
+    url_id = get_url_for_stats(db, short_code, share_token, current_user).id
+    # Dependencies are torn down only after the response has been sent, so
+    # release the connection now rather than hold it for the whole stream
+    db.close()
+    
+    return StreamingResponse(
+        live_click_events(request, url_id, mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
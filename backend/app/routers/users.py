@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
 from .. import auth
-from ..database import get_db
+from ..export import EXPORT_FORMATS, export_clicks
+from ..database import get_db, get_read_db
 from ..models.models import User, SiteSettings
-from ..schemas.schemas import UserCreate, User as UserSchema, UserDetail
+from ..ratelimit import rate_limit
+from ..schemas.schemas import UserCreate, User as UserSchema, UserDetail, UserSummary
+from ..stats import user_summary
 
 router = APIRouter(
     prefix="/api/users",
@@ -11,7 +17,7 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/", response_model=UserSchema)
+@router.post("/", response_model=UserSchema, dependencies=[Depends(rate_limit("auth"))])
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     # Check if registration is enabled
     settings = db.query(SiteSettings).first()
@@ -58,6 +64,34 @@ def read_users_me(current_user: User = Depends(auth.get_current_user)):
 def read_users_me_details(current_user: User = Depends(auth.get_current_user)):
     return current_user
 
+@router.get("/me/summary", response_model=UserSummary)
+def read_users_me_summary(
+    top: int = Query(5, ge=1, le=50),
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(auth.get_current_user)
+):
+    """Dashboard totals, top links and a daily click sparkline across all of the current user's links"""
+    return user_summary(db, current_user.id, top, days)
+
+@router.get("/me/clicks/export")
+def export_my_clicks(
+    format: str = Query("csv", regex="^(csv|ndjson|columnar)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth.get_current_user)
+):
+    """Stream the raw click log of all of the current user's URLs"""
+    # The export reads through its own session; release the one used to
+    # authenticate instead of holding it until the download ends
+    db.close()
+    return StreamingResponse(
+        export_clicks(format, current_user.id, start=start, end=end),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="clicks.{format}"'}
+    )
+
 @router.get("/{user_id}", response_model=UserSchema)
 def read_user(user_id: int, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.id == user_id).first()
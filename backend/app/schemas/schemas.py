@@ -1,5 +1,6 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Dict, Optional, List
+from .site_settings import RedirectStatusCode
 from datetime import datetime
 
 # URL Schemas
@@ -25,7 +26,15 @@ class URLBase(BaseModel):
     original_url: str
 
 class URLCreate(URLBase):
-    pass
+    # Return the user's existing link for the same URL instead of a new one
+    deduplicate: bool = False
+    redirect_status_code: Optional[RedirectStatusCode] = None
+    redirect_cache_max_age: Optional[int] = Field(None, ge=0)
+
+class URLUpdate(BaseModel):
+    # null resets a setting to the site default
+    redirect_status_code: Optional[RedirectStatusCode] = None
+    redirect_cache_max_age: Optional[int] = Field(None, ge=0)
 
 class URL(URLBase):
     id: int
@@ -33,12 +42,21 @@ class URL(URLBase):
     created_at: datetime
     user_id: int
     click_count: Optional[int] = 0
+    redirect_status_code: Optional[int] = None
+    redirect_cache_max_age: Optional[int] = None
 
     class Config:
         orm_mode = True
 
+# Maximum number of short codes accepted per bulk deletion request
+MAX_BULK_DELETE_CODES = 10000
+
+class URLBulkDelete(BaseModel):
+    short_codes: List[str] = Field(..., max_items=MAX_BULK_DELETE_CODES)
+
 class URLDetail(URL):
     clicks: List[Click] = []
+    next_clicks_cursor: Optional[str] = None
 
 # User Schemas
 class UserBase(BaseModel):
@@ -59,6 +77,18 @@ class User(UserBase):
 class UserDetail(User):
     urls: List[URL] = []
 
+class LinkSummary(BaseModel):
+    short_code: str
+    original_url: str
+    click_count: int
+
+class UserSummary(BaseModel):
+    total_links: int
+    total_clicks: int
+    bot_hits: int
+    top_links: List[LinkSummary]
+    clicks_by_day: Dict[str, int]
+
 # Token Schemas
 class Token(BaseModel):
     access_token: str
@@ -78,6 +108,22 @@ class URLStats(BaseModel):
     clicks_over_time: dict
     operating_systems: dict
     locations: dict
+    bot_hits: int = 0
+
+    class Config:
+        orm_mode = True
+
+# Background Job Schemas
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: int
+    processed: int
+    detail: dict
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
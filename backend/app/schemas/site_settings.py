@@ -1,10 +1,14 @@
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+RedirectStatusCode = Literal[301, 302, 307, 308]
 
 class SiteSettings(BaseModel):
     id: int
     registration_enabled: bool
+    redirect_status_code: int
+    redirect_cache_max_age: int
     last_updated: datetime
     
     class Config:
@@ -15,3 +19,5 @@ class SiteSettingsCreate(BaseModel):
     
 class SiteSettingsUpdate(BaseModel):
     registration_enabled: Optional[bool] = None
+    redirect_status_code: Optional[RedirectStatusCode] = None
+    redirect_cache_max_age: Optional[int] = Field(None, ge=0)
@@ -0,0 +1,244 @@
+from collections import Counter, defaultdict
+from itertools import chain
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+
+from .enrichment import parse_user_agent
+from .models.models import URL, Click, ClickRollup, Location, OperatingSystem, Referrer, UserAgent
+
+# (url_id, day, dimension, value, count) - the shape shared by live
+# aggregates and archived rollups. The "total" dimension is always grouped
+# by day; the others only when by_day is requested.
+AggregateRow = Tuple[int, Optional[str], str, Optional[str], int]
+
+# dimension name -> (lookup table, foreign key on clicks)
+GROUPED_DIMENSIONS = {
+    "referrer": (Referrer, Click.referrer_id),
+    "operating_system": (OperatingSystem, Click.operating_system_id),
+    "location": (Location, Click.location_id),
+}
+
+def browser_family(user_agent_string: Optional[str]) -> str:
+    """Map a user agent string to a readable browser name"""
+    if not user_agent_string:
+        return "Unknown"
+
+    try:
+        family = parse_user_agent(user_agent_string).browser.family
+
+        # Clean up browser family names for better readability
+        if family == "Chrome Mobile":
+            family = "Chrome (Mobile)"
+        elif family == "Firefox Mobile":
+            family = "Firefox (Mobile)"
+        elif family == "Mobile Safari":
+            family = "Safari (Mobile)"
+
+        return family
+    except Exception:
+        # Fallback to basic detection if the library fails
+        ua_lower = user_agent_string.lower()
+
+        if "chrome" in ua_lower and "chromium" not in ua_lower and "edg" not in ua_lower and "opera" not in ua_lower and "opr" not in ua_lower:
+            return "Chrome"
+        elif "firefox" in ua_lower:
+            return "Firefox"
+        elif "safari" in ua_lower and "chrome" not in ua_lower:
+            return "Safari"
+        elif "edg" in ua_lower:
+            return "Edge"
+        elif "opera" in ua_lower or "opr" in ua_lower:
+            return "Opera"
+        elif "msie" in ua_lower or "trident" in ua_lower:
+            return "Internet Explorer"
+        elif "chromium" in ua_lower:
+            return "Chromium"
+        return "Other"
+
+def _day(value) -> Optional[str]:
+    # SQLite returns date() as a string, PostgreSQL as a date
+    return str(value) if value is not None else None
+
+def click_aggregates(
+    db: Session,
+    url_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    by_day: bool = False,
+) -> Iterator[AggregateRow]:
+    """
+    Aggregate raw clicks with one GROUP BY query per dimension. Filtering on
+    clicked_at lets PostgreSQL prune the monthly partitions it does not need.
+    """
+    filters = []
+    if url_id is not None:
+        filters.append(Click.url_id == url_id)
+    if start:
+        filters.append(Click.clicked_at >= start)
+    if end:
+        filters.append(Click.clicked_at < end)
+
+    day = func.date(Click.clicked_at)
+
+    def grouped(model, foreign_key):
+        # Group on the integer key; the lookup table only resolves one
+        # string per group
+        keys = [Click.url_id, day, foreign_key] if by_day else [Click.url_id, foreign_key]
+        rows = (
+            db.query(*keys, model.value, func.count(Click.id))
+            .outerjoin(model, model.id == foreign_key)
+            .filter(*filters)
+            .group_by(*keys, model.value)
+        )
+        for row in rows:
+            if by_day:
+                yield row[0], _day(row[1]), row[3], row[4]
+            else:
+                yield row[0], None, row[2], row[3]
+
+    for row_url_id, row_day, count in db.query(Click.url_id, day, func.count(Click.id)).filter(*filters).group_by(Click.url_id, day):
+        yield row_url_id, _day(row_day), "total", None, count
+
+    for dimension, (model, foreign_key) in GROUPED_DIMENSIONS.items():
+        for row_url_id, row_day, value, count in grouped(model, foreign_key):
+            yield row_url_id, row_day, dimension, value, count
+
+    # Parse each distinct user agent once, not once per click
+    families: Dict[Optional[str], str] = {}
+    browsers: Dict[tuple, int] = defaultdict(int)
+    for row_url_id, row_day, user_agent, count in grouped(UserAgent, Click.user_agent_id):
+        if user_agent not in families:
+            families[user_agent] = browser_family(user_agent)
+        browsers[(row_url_id, row_day, families[user_agent])] += count
+    for (row_url_id, row_day, family), count in browsers.items():
+        yield row_url_id, row_day, "browser", family, count
+
+def rollup_aggregates(
+    db: Session,
+    url_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[AggregateRow]:
+    """Aggregates of clicks that have been archived by the retention policy"""
+    query = db.query(ClickRollup).filter(ClickRollup.url_id == url_id)
+    if start:
+        query = query.filter(ClickRollup.day >= start.date())
+    if end:
+        # Rollups are per day: keep the end day unless the range stops at its midnight
+        last_day = end.date() if end.time() != time.min else end.date() - timedelta(days=1)
+        query = query.filter(ClickRollup.day <= last_day)
+    for rollup in query:
+        yield rollup.url_id, rollup.day.isoformat(), rollup.dimension, rollup.value, rollup.count
+
+def archived_click_counts(db: Session, url_ids: List[int]) -> Dict[int, int]:
+    """Total clicks per URL that now only live in rollups"""
+    if not url_ids:
+        return {}
+    rows = (
+        db.query(ClickRollup.url_id, func.sum(ClickRollup.count))
+        .filter(ClickRollup.url_id.in_(url_ids), ClickRollup.dimension == "total")
+        .group_by(ClickRollup.url_id)
+    )
+    return {url_id: int(total) for url_id, total in rows}
+
+def build_stats(rows: Iterable[AggregateRow]) -> dict:
+    """Fold aggregate rows into the URLStats counters"""
+    total_clicks = 0
+    clicks_by_date: Dict[str, int] = defaultdict(int)
+    counters = {
+        "referrer": Counter(),
+        "browser": Counter(),
+        "operating_system": Counter(),
+        "location": Counter(),
+    }
+
+    for _, day, dimension, value, count in rows:
+        if dimension == "total":
+            total_clicks += count
+            if day:
+                clicks_by_date[day] += count
+        elif dimension == "referrer":
+            counters[dimension][value or "Direct/Unknown"] += count
+        elif dimension in counters:
+            counters[dimension][value or "Unknown"] += count
+
+    return {
+        "total_clicks": total_clicks,
+        "referrers": dict(counters["referrer"]),
+        "browsers": dict(counters["browser"]),
+        "operating_systems": dict(counters["operating_system"]),
+        "locations": dict(counters["location"]),
+        # Sort clicks by date
+        "clicks_over_time": dict(sorted(clicks_by_date.items())),
+    }
+
+def user_summary(db: Session, user_id: int, top: int, days: int, today: Optional[date] = None) -> dict:
+    """
+    Totals, the top links by clicks and clicks per day over the last `days`
+    days for all links of a user. Each part is one aggregate query over live
+    clicks and rollups together, so the rows returned do not grow with the
+    number of links.
+    """
+    links, bot_hits = db.query(func.count(URL.id), func.coalesce(func.sum(URL.bot_hits), 0)).filter(
+        URL.user_id == user_id
+    ).one()
+
+    live = (
+        db.query(Click.url_id.label("url_id"), func.count(Click.id).label("clicks"))
+        .join(URL, URL.id == Click.url_id)
+        .filter(URL.user_id == user_id)
+        .group_by(Click.url_id)
+    )
+    archived = (
+        db.query(ClickRollup.url_id.label("url_id"), func.sum(ClickRollup.count).label("clicks"))
+        .join(URL, URL.id == ClickRollup.url_id)
+        .filter(URL.user_id == user_id, ClickRollup.dimension == "total")
+        .group_by(ClickRollup.url_id)
+    )
+    combined = live.union_all(archived).subquery()
+    per_url = (
+        db.query(combined.c.url_id, func.sum(combined.c.clicks).label("clicks"))
+        .group_by(combined.c.url_id)
+        .subquery()
+    )
+    total_clicks = db.query(func.coalesce(func.sum(per_url.c.clicks), 0)).scalar()
+    top_links = (
+        db.query(URL.short_code, URL.original_url, per_url.c.clicks)
+        .join(per_url, per_url.c.url_id == URL.id)
+        .order_by(desc(per_url.c.clicks), URL.id)
+        .limit(top)
+    )
+
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    clicks_by_day = {(first_day + timedelta(days=i)).isoformat(): 0 for i in range(days)}
+    day = func.date(Click.clicked_at)
+    live_days = (
+        db.query(day, func.count(Click.id))
+        .join(URL, URL.id == Click.url_id)
+        .filter(URL.user_id == user_id, Click.clicked_at >= datetime.combine(first_day, time.min))
+        .group_by(day)
+    )
+    archived_days = (
+        db.query(ClickRollup.day, func.sum(ClickRollup.count))
+        .join(URL, URL.id == ClickRollup.url_id)
+        .filter(URL.user_id == user_id, ClickRollup.dimension == "total", ClickRollup.day >= first_day)
+        .group_by(ClickRollup.day)
+    )
+    for row_day, count in chain(live_days, archived_days):
+        key = _day(row_day)
+        if key in clicks_by_day:
+            clicks_by_day[key] += int(count)
+
+    return {
+        "total_links": links,
+        "total_clicks": int(total_clicks),
+        "bot_hits": int(bot_hits),
+        "top_links": [
+            {"short_code": short_code, "original_url": original_url, "click_count": int(clicks)}
+            for short_code, original_url, clicks in top_links
+        ],
+        "clicks_by_day": clicks_by_day,
+    }
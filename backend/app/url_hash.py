@@ -0,0 +1,36 @@
+"""
+Fixed-size keys for long URLs, used to find a user's existing link for the
+same destination without indexing the URL string itself.
+"""
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for comparison: scheme and host lowercased,
+    default port and empty path spelled one way. Query and fragment are kept
+    as they are, since sites may depend on them.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc
+    if parts.hostname:
+        host = parts.hostname
+        if ":" in host:
+            host = f"[{host}]"
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{port}"
+        userinfo = netloc.rpartition("@")[0]
+        netloc = f"{userinfo}@{host}" if userinfo else host
+    path = parts.path or ("/" if netloc else "")
+    return urlunsplit((scheme, netloc, path, parts.query, parts.fragment))
+
+def hash_url(url: str) -> str:
+    """Hex SHA-256 of the normalized URL, 64 characters"""
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
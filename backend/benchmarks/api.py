@@ -0,0 +1,201 @@
+"""
+Load-test the API against a freshly seeded database and record latency
+percentiles and throughput per scenario as JSON.
+
+In process, through httpx's ASGI transport:
+
+    python -m benchmarks.api --scale small --output results/base.json
+
+Against a real uvicorn server on localhost:
+
+    python -m benchmarks.api --transport uvicorn --scale small --output results/head.json
+
+Compare two result files with python -m benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import httpx
+
+from .seed import add_scale_arguments, scale_from_arguments, short_code_for
+
+SCENARIOS = ["redirect", "create", "list", "stats"]
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float], errors: int, elapsed: float, concurrency: int) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+    }
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable, requests: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await make_request(client, i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+
+def build_scenarios(scale: Dict[str, int], tokens: Dict[int, str], seed_value: int) -> Dict[str, Callable]:
+    rng = random.Random(seed_value)
+    users, urls_per_user = scale["users"], scale["urls_per_user"]
+
+    def auth(user_index: int) -> dict:
+        return {"Authorization": f"Bearer {tokens[user_index]}"}
+
+    async def redirect(client, i):
+        code = short_code_for(rng.randrange(users), rng.randrange(urls_per_user))
+        return await client.get(f"/r/{code}", headers={"User-Agent": "benchmark"})
+
+    async def create(client, i):
+        user = rng.randrange(users)
+        return await client.post("/api/urls/", json={"original_url": f"https://example.com/new/{i}"}, headers=auth(user))
+
+    async def list_urls(client, i):
+        return await client.get("/api/urls/", headers=auth(rng.randrange(users)))
+
+    async def stats(client, i):
+        user = rng.randrange(users)
+        code = short_code_for(user, rng.randrange(urls_per_user))
+        return await client.get(f"/api/urls/{code}/stats", headers=auth(user))
+
+    return {"redirect": redirect, "create": create, "list": list_urls, "stats": stats}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_uvicorn(port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready")
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run_benchmarks(args, scale: Dict[str, int]) -> dict:
+    from app.auth import create_access_token
+
+    tokens = {u: create_access_token({"sub": f"bench{u}"}) for u in range(scale["users"])}
+    scenarios = build_scenarios(scale, tokens, args.seed)
+    results = {}
+
+    if args.transport == "asgi":
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+        server = None
+    else:
+        port = free_port()
+        server = start_uvicorn(port, dict(os.environ))
+        transport = None
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency, args.warmup)
+                print(f"{name:9} p50 {results[name]['p50_ms']:9.2f} ms  p99 {results[name]['p99_ms']:9.2f} ms  "
+                      f"{results[name]['throughput_rps']:9.1f} req/s  errors {results[name]['errors']}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ShortURL API")
+    add_scale_arguments(parser)
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--database-url", help="database to seed and benchmark (default: a temporary SQLite file)")
+    parser.add_argument("--force", action="store_true", help="seed --database-url even if it has been migrated or has users")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    scale = scale_from_arguments(args)
+    with tempfile.TemporaryDirectory() as directory:
+        # The app reads DATABASE_URL when first imported
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{directory}/benchmark.db"
+        # Measure the app, not the rate limiter rejecting the load
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        sys.path.insert(0, BACKEND_DIR)
+
+        from .seed import seed
+        dataset = seed(seed_value=args.seed, force=args.force, **scale)
+        results = asyncio.run(run_benchmarks(args, scale))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "transport": args.transport,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "dataset": dataset,
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Compare the wide clicks table (one string per dimension per click) with the
+dictionary-encoded layout (integer keys into lookup tables): database size
+and the time of the per-URL stats aggregations.
+
+    python -m benchmarks.click_dimensions --clicks 500000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WIDE_SCHEMA = """
+CREATE TABLE clicks (
+    id INTEGER PRIMARY KEY,
+    url_id INTEGER,
+    clicked_at DATETIME,
+    referrer VARCHAR,
+    user_agent VARCHAR,
+    ip_address VARCHAR,
+    client_host VARCHAR,
+    operating_system VARCHAR,
+    location VARCHAR,
+    country VARCHAR,
+    city VARCHAR
+);
+CREATE INDEX ix_clicks_url_id_clicked_at_id ON clicks (url_id, clicked_at, id);
+"""
+
+ENCODED_SCHEMA = """
+CREATE TABLE referrers (id INTEGER PRIMARY KEY, value VARCHAR NOT NULL UNIQUE);
+CREATE TABLE user_agents (id INTEGER PRIMARY KEY, value VARCHAR NOT NULL UNIQUE);
+CREATE TABLE operating_systems (id INTEGER PRIMARY KEY, value VARCHAR NOT NULL UNIQUE);
+CREATE TABLE locations (id INTEGER PRIMARY KEY, value VARCHAR NOT NULL UNIQUE, country VARCHAR, city VARCHAR);
+CREATE TABLE clicks (
+    id INTEGER PRIMARY KEY,
+    url_id INTEGER,
+    clicked_at DATETIME,
+    ip_address VARCHAR,
+    referrer_id INTEGER REFERENCES referrers (id),
+    user_agent_id INTEGER REFERENCES user_agents (id),
+    operating_system_id INTEGER REFERENCES operating_systems (id),
+    location_id INTEGER REFERENCES locations (id)
+);
+CREATE INDEX ix_clicks_url_id_clicked_at_id ON clicks (url_id, clicked_at, id);
+"""
+
+WIDE_STATS = [
+    "SELECT date(clicked_at), count(id) FROM clicks WHERE url_id = ? GROUP BY date(clicked_at)",
+    "SELECT referrer, count(id) FROM clicks WHERE url_id = ? GROUP BY referrer",
+    "SELECT operating_system, count(id) FROM clicks WHERE url_id = ? GROUP BY operating_system",
+    "SELECT location, count(id) FROM clicks WHERE url_id = ? GROUP BY location",
+    "SELECT user_agent, count(id) FROM clicks WHERE url_id = ? GROUP BY user_agent",
+]
+
+ENCODED_STATS = [
+    "SELECT date(clicked_at), count(id) FROM clicks WHERE url_id = ? GROUP BY date(clicked_at)",
+] + [
+    f"SELECT c.{key}, d.value, count(c.id) FROM clicks c LEFT JOIN {table} d ON d.id = c.{key} "
+    f"WHERE c.url_id = ? GROUP BY c.{key}, d.value"
+    for table, key in [
+        ("referrers", "referrer_id"),
+        ("operating_systems", "operating_system_id"),
+        ("locations", "location_id"),
+        ("user_agents", "user_agent_id"),
+    ]
+]
+
+OPERATING_SYSTEMS = ["Windows", "Mac OS X", "iOS", "Android", "Linux", "Chrome OS", "Other"]
+
+def synthetic_values(rng: random.Random):
+    user_agents = [
+        f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        f"Chrome/{100 + i // 10}.0.{i}.0 Safari/537.36"
+        for i in range(500)
+    ]
+    referrers = [f"https://site{i}.example.com/articles/{i * 7919 % 10007}" for i in range(200)]
+    locations = [(f"City{i}, Country{i % 40}", f"Country{i % 40}", f"City{i}") for i in range(300)]
+    locations.append(("Unknown", None, None))
+    return user_agents, referrers, locations
+
+def seed(path: str, encoded: bool, clicks: int, urls: int, seed_value: int):
+    rng = random.Random(seed_value)
+    user_agents, referrers, locations = synthetic_values(rng)
+    start = datetime(2026, 1, 1)
+
+    db = sqlite3.connect(path)
+    db.executescript(ENCODED_SCHEMA if encoded else WIDE_SCHEMA)
+    if encoded:
+        db.executemany("INSERT INTO user_agents (id, value) VALUES (?, ?)", enumerate(user_agents, 1))
+        db.executemany("INSERT INTO referrers (id, value) VALUES (?, ?)", enumerate(referrers, 1))
+        db.executemany("INSERT INTO operating_systems (id, value) VALUES (?, ?)", enumerate(OPERATING_SYSTEMS, 1))
+        db.executemany("INSERT INTO locations (id, value, country, city) VALUES (?, ?, ?, ?)",
+                       [(i, *location) for i, location in enumerate(locations, 1)])
+
+    def rows():
+        for _ in range(clicks):
+            # Skewed picks so a few values dominate, as in real traffic
+            ua = min(int(rng.expovariate(1 / 40)), len(user_agents) - 1)
+            ref = rng.choice([None, min(int(rng.expovariate(1 / 20)), len(referrers) - 1)])
+            os_index = rng.randrange(len(OPERATING_SYSTEMS))
+            loc = min(int(rng.expovariate(1 / 30)), len(locations) - 1)
+            ip = f"{rng.randrange(1, 255)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+            clicked_at = (start + timedelta(seconds=rng.randrange(180 * 86400))).isoformat(" ")
+            url_id = min(int(rng.expovariate(1 / (urls / 10))), urls - 1) + 1
+            if encoded:
+                yield (url_id, clicked_at, ip, None if ref is None else ref + 1, ua + 1, os_index + 1, loc + 1)
+            else:
+                location, country, city = locations[loc]
+                yield (url_id, clicked_at, None if ref is None else referrers[ref], user_agents[ua],
+                       ip, ip, OPERATING_SYSTEMS[os_index], location, country, city)
+
+    if encoded:
+        db.executemany(
+            "INSERT INTO clicks (url_id, clicked_at, ip_address, referrer_id, user_agent_id, "
+            "operating_system_id, location_id) VALUES (?, ?, ?, ?, ?, ?, ?)", rows())
+    else:
+        db.executemany(
+            "INSERT INTO clicks (url_id, clicked_at, referrer, user_agent, ip_address, client_host, "
+            "operating_system, location, country, city) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows())
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+
+def time_stats(path: str, queries, url_id: int, repeat: int) -> dict:
+    db = sqlite3.connect(path)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in queries:
+            db.execute(query, (url_id,)).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    db.close()
+    return {"median_ms": round(statistics.median(timings), 2), "min_ms": round(min(timings), 2)}
+
+def run(clicks: int, urls: int, repeat: int, seed_value: int) -> dict:
+    results = {"clicks": clicks, "urls": urls}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, encoded, queries in (("wide", False, WIDE_STATS), ("encoded", True, ENCODED_STATS)):
+            path = os.path.join(directory, f"{name}.db")
+            seed(path, encoded, clicks, urls, seed_value)
+            results[name] = {
+                "size_bytes": os.path.getsize(path),
+                # url 1 is the most clicked link
+                "stats": time_stats(path, queries, 1, repeat),
+            }
+    results["size_ratio"] = round(results["encoded"]["size_bytes"] / results["wide"]["size_bytes"], 3)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=200000)
+    parser.add_argument("--urls", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.clicks, args.urls, args.repeat, args.seed)
+    for name in ("wide", "encoded"):
+        result = results[name]
+        print(f"{name:8} {result['size_bytes'] / 1024 / 1024:8.1f} MiB   stats median {result['stats']['median_ms']:8.2f} ms")
+    print(f"size ratio (encoded / wide): {results['size_ratio']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
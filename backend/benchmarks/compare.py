@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare results/base.json results/head.json --threshold 0.10
+
+Exits with status 1 when any scenario's p50 or p99 latency grew, or its
+throughput fell, by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when a higher value is better
+METRICS = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+}
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Rows of (scenario, metric, baseline, candidate, relative change, regressed)"""
+    rows = []
+    for scenario, base in baseline["results"].items():
+        current = candidate["results"].get(scenario)
+        if current is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = base[metric], current[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((scenario, metric, before, after, change, regressed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change tolerated (default 0.10)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta']['revision']}  candidate {candidate['meta']['revision']}")
+    for key in ("transport", "concurrency", "dataset"):
+        if baseline["meta"].get(key) != candidate["meta"].get(key):
+            print(f"warning: runs differ in {key}, results may not be comparable")
+    rows = compare(baseline, candidate, args.threshold)
+    for scenario, metric, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{scenario:9} {metric:15} {before:10.2f} -> {after:10.2f}  {change:+7.1%}  {flag}")
+
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Check that click exports stream in fixed memory: seed a database with many
+clicks (1M by default), download the export from a uvicorn server and track
+the server's RSS while it streams. Linux only (reads /proc/<pid>/status).
+
+    python -m benchmarks.export_memory --rows 1000000 --formats csv ndjson columnar
+
+Exits non-zero when RSS grows by more than --max-growth-mb during any export.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from .api import BACKEND_DIR, free_port, git_revision, start_uvicorn
+from .seed import SEED_PASSWORD
+
+URLS = 10
+
+def read_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+class RSSSampler(threading.Thread):
+    """Record the peak RSS of a process until stopped"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = read_rss_kb(pid)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, read_rss_kb(self.pid))
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak_kb
+
+def download(client: httpx.Client, headers: dict, fmt: str) -> dict:
+    size = 0
+    lines = 0
+    started = time.perf_counter()
+    with client.stream("GET", "/api/users/me/clicks/export", params={"format": fmt}, headers=headers) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    return {"bytes": size, "lines": lines, "seconds": round(time.perf_counter() - started, 2)}
+
+def measure(port: int, pid: int, formats: list) -> list:
+    results = []
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        token = client.post("/api/token", data={"username": "bench0", "password": SEED_PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for fmt in formats:
+            # A first export warms up imports, pools and allocator arenas
+            # so the measured run only shows growth caused by the row count
+            download(client, headers, fmt)
+            time.sleep(0.5)
+            baseline_kb = read_rss_kb(pid)
+            sampler = RSSSampler(pid)
+            sampler.start()
+            result = download(client, headers, fmt)
+            peak_kb = sampler.stop()
+            results.append({
+                "format": fmt,
+                **result,
+                "baseline_rss_kb": baseline_kb,
+                "peak_rss_kb": peak_kb,
+                "growth_kb": peak_kb - baseline_kb,
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that click exports stream in bounded memory")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="clicks to seed and export")
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "columnar"], choices=["csv", "ndjson", "columnar"])
+    parser.add_argument("--max-growth-mb", type=float, default=64, help="fail when RSS grows more than this during an export")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{directory}/export.db", RATE_LIMIT_ENABLED="0")
+        print(f"Seeding {args.rows} clicks...", flush=True)
+        subprocess.check_call(
+            [sys.executable, "-m", "benchmarks.seed", "--database-url", env["DATABASE_URL"],
+             "--users", "1", "--urls-per-user", str(URLS), "--clicks-per-url", str(-(-args.rows // URLS))],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+
+        port = free_port()
+        server = start_uvicorn(port, env)
+        try:
+            results = measure(port, server.pid, args.formats)
+        finally:
+            server.terminate()
+            server.wait()
+
+    failed = False
+    for result in results:
+        growth_mb = result["growth_kb"] / 1024
+        ok = growth_mb <= args.max_growth_mb
+        failed |= not ok
+        print(f"{result['format']:9} {result['lines']:>9} lines  {result['bytes'] / 2**20:8.1f} MiB  "
+              f"{result['seconds']:6.1f} s  RSS {result['baseline_rss_kb'] / 1024:6.1f} -> "
+              f"{result['peak_rss_kb'] / 1024:6.1f} MiB (+{growth_mb:.1f})  {'ok' if ok else 'FAIL'}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"revision": git_revision(), "rows": args.rows,
+                                "max_growth_mb": args.max_growth_mb}, "results": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Seed a database with a synthetic, reproducible dataset of users, URLs and
+clicks for benchmarking. The database is dropped and recreated, so it must
+be named explicitly:
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db --scale small
+
+Databases that have been migrated or have users are left alone unless
+--force is given.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict
+
+# Password of every seeded user
+SEED_PASSWORD = "benchmark"
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {"users": 2, "urls_per_user": 5, "clicks_per_url": 20},
+    "small": {"users": 5, "urls_per_user": 20, "clicks_per_url": 200},
+    "medium": {"users": 20, "urls_per_user": 50, "clicks_per_url": 500},
+    "large": {"users": 50, "urls_per_user": 100, "clicks_per_url": 2000},
+}
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+]
+OPERATING_SYSTEMS = ["Windows", "Mac OS X", "iOS", "Android", "Ubuntu"]
+REFERRERS = [None, "https://www.google.com/", "https://t.co/", "https://news.ycombinator.com/", "https://www.reddit.com/"]
+LOCATIONS = [("Unknown", None, None), ("Berlin, Germany", "Germany", "Berlin"), ("Paris, France", "France", "Paris"),
+             ("Tokyo, Japan", "Japan", "Tokyo"), ("United States", "United States", None)]
+
+def short_code_for(user_index: int, url_index: int) -> str:
+    """Deterministic short codes so benchmark runs can address seeded URLs"""
+    return f"b{user_index:03d}{url_index:04d}"
+
+def refuse_reason(engine) -> str:
+    """Why a database looks like real data rather than a benchmark copy, or "" """
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(engine)
+    if inspector.has_table("alembic_version"):
+        return "it has been migrated (alembic_version table)"
+    if inspector.has_table("users"):
+        with engine.connect() as connection:
+            if connection.execute(text("SELECT 1 FROM users LIMIT 1")).first():
+                return "it has users"
+    return ""
+
+def seed(users: int, urls_per_user: int, clicks_per_url: int, seed_value: int = 1, batch_size: int = 10000,
+         force: bool = False) -> dict:
+    from app.auth import get_password_hash
+    from app.database import DATABASE_URL, Base, engine
+    from app.models.models import URL, Click, Location, OperatingSystem, Referrer, SiteSettings, User, UserAgent
+
+    reason = refuse_reason(engine)
+    if reason and not force:
+        raise RuntimeError(f"Refusing to drop {DATABASE_URL}: {reason}. Pass --force to seed it anyway.")
+
+    rng = random.Random(seed_value)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.utcnow()
+    # Hashing is deliberately slow; every seeded user shares one hash
+    hashed_password = get_password_hash(SEED_PASSWORD)
+
+    with engine.begin() as connection:
+        connection.execute(SiteSettings.__table__.insert(), [{"registration_enabled": True}])
+        connection.execute(UserAgent.__table__.insert(), [{"id": i, "value": v} for i, v in enumerate(USER_AGENTS, 1)])
+        connection.execute(OperatingSystem.__table__.insert(), [{"id": i, "value": v} for i, v in enumerate(OPERATING_SYSTEMS, 1)])
+        connection.execute(Referrer.__table__.insert(), [{"id": i, "value": v} for i, v in enumerate(REFERRERS, 1) if v])
+        connection.execute(Location.__table__.insert(), [
+            {"id": i, "value": value, "country": country, "city": city}
+            for i, (value, country, city) in enumerate(LOCATIONS, 1)
+        ])
+
+        connection.execute(User.__table__.insert(), [
+            {"id": u + 1, "username": f"bench{u}", "email": f"bench{u}@example.com",
+             "hashed_password": hashed_password, "created_at": now, "is_admin": 1 if u == 0 else 0}
+            for u in range(users)
+        ])
+        connection.execute(URL.__table__.insert(), [
+            {"id": u * urls_per_user + i + 1, "user_id": u + 1, "short_code": short_code_for(u, i),
+             "original_url": f"https://example.com/{u}/{i}?utm_source=benchmark", "created_at": now}
+            for u in range(users) for i in range(urls_per_user)
+        ])
+
+        batch = []
+        total_urls = users * urls_per_user
+        for url_id in range(1, total_urls + 1):
+            for _ in range(clicks_per_url):
+                batch.append({
+                    "url_id": url_id,
+                    "clicked_at": now - timedelta(seconds=rng.randrange(90 * 86400)),
+                    "ip_address": f"203.0.113.{rng.randrange(256)}",
+                    "user_agent_id": rng.randrange(len(USER_AGENTS)) + 1,
+                    "operating_system_id": rng.randrange(len(OPERATING_SYSTEMS)) + 1,
+                    "referrer_id": rng.choice([None, 2, 3, 4, 5]),
+                    "location_id": rng.randrange(len(LOCATIONS)) + 1,
+                })
+                if len(batch) >= batch_size:
+                    connection.execute(Click.__table__.insert(), batch)
+                    batch = []
+        if batch:
+            connection.execute(Click.__table__.insert(), batch)
+
+    return {
+        "users": users,
+        "urls_per_user": urls_per_user,
+        "clicks_per_url": clicks_per_url,
+        "clicks": users * urls_per_user * clicks_per_url,
+        "seed": seed_value,
+    }
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, help="override the scale's user count")
+    parser.add_argument("--urls-per-user", type=int, help="override the scale's URLs per user")
+    parser.add_argument("--clicks-per-url", type=int, help="override the scale's clicks per URL")
+    parser.add_argument("--seed", type=int, default=1)
+
+def scale_from_arguments(args) -> Dict[str, int]:
+    scale = dict(SCALES[args.scale])
+    for name in ("users", "urls_per_user", "clicks_per_url"):
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+    return scale
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic benchmark dataset")
+    add_scale_arguments(parser)
+    parser.add_argument("--database-url", required=True, help="database to drop and seed")
+    parser.add_argument("--force", action="store_true", help="seed even a database that has been migrated or has users")
+    args = parser.parse_args()
+
+    # Set before app.database is imported, which would otherwise fall back
+    # to the DATABASE_URL from .env
+    os.environ["DATABASE_URL"] = args.database_url
+    try:
+        print(seed(seed_value=args.seed, force=args.force, **scale_from_arguments(args)))
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure cold start: the time to import app.main in a fresh interpreter and
+the time from launching uvicorn until the first request is answered.
+
+    python -m benchmarks.startup --runs 5 --output results/startup.json
+
+Use --importtime to list the slowest imports (python -X importtime).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .api import BACKEND_DIR, free_port, git_revision
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def measure_import(env: dict) -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_request(env: dict, path: str) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{path}").status_code < 500:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn did not answer within 60 seconds")
+    finally:
+        process.terminate()
+        process.wait()
+
+def slowest_imports(env: dict, count: int) -> list:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module>"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return [{"module": name.strip(), "cumulative_ms": cumulative / 1000, "self_ms": own / 1000}
+            for cumulative, own, name in rows[:count]]
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/api/health", help="path of the first request")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also report the N slowest imports")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{directory}/startup.db")
+        imports = [measure_import(env) for _ in range(args.runs)]
+        first_requests = [measure_first_request(env, args.path) for _ in range(args.runs)]
+        report = {
+            "meta": {"revision": git_revision(), "runs": args.runs, "path": args.path},
+            "import_app_main": summarize(imports),
+            "time_to_first_request": summarize(first_requests),
+        }
+        if args.importtime:
+            report["slowest_imports"] = slowest_imports(env, args.importtime)
+
+    print(f"import app.main        median {report['import_app_main']['median_ms']:8.1f} ms")
+    print(f"time to first request  median {report['time_to_first_request']['median_ms']:8.1f} ms")
+    for row in report.get("slowest_imports", []):
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
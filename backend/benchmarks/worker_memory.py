@@ -0,0 +1,111 @@
+"""
+Report per-worker memory of serve.py for several worker counts, with and
+without preloading in the parent. Linux only (reads /proc/<pid>/smaps_rollup).
+
+    python -m benchmarks.worker_memory --workers 1 4 16
+
+RSS counts shared pages in full for every worker; PSS divides them between
+the processes sharing them, so PSS is what each extra worker really costs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .api import BACKEND_DIR, free_port, git_revision
+
+# Requests sent after startup so every worker has parsed user agents,
+# serialized responses and touched the database
+WARMUP_REQUESTS = 200
+
+def read_memory(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": values.get("Rss", 0),
+        "pss_kb": values.get("Pss", 0),
+        "shared_kb": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+        "private_kb": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+def child_pids(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def measure(workers: int, preload: bool, env: dict) -> dict:
+    port = free_port()
+    command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 120
+        while len(child_pids(process.pid)) < workers or not _ready(port):
+            if time.monotonic() > deadline:
+                raise RuntimeError("workers did not start")
+            time.sleep(0.1)
+
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            for i in range(WARMUP_REQUESTS * workers):
+                # New connections spread the requests across workers
+                client.get("/r/missing", headers={"User-Agent": f"Mozilla/5.0 (X11; Linux x86_64) Firefox/{i % 50}.0",
+                                                  "Connection": "close"})
+        time.sleep(0.5)
+
+        per_worker = [read_memory(pid) for pid in child_pids(process.pid)]
+        return {
+            "workers": workers,
+            "preload": preload,
+            "parent": read_memory(process.pid),
+            "mean_worker_rss_kb": round(sum(w["rss_kb"] for w in per_worker) / len(per_worker)),
+            "mean_worker_pss_kb": round(sum(w["pss_kb"] for w in per_worker) / len(per_worker)),
+            "total_pss_kb": sum(w["pss_kb"] for w in per_worker) + read_memory(process.pid)["pss_kb"],
+            "per_worker": per_worker,
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+def _ready(port: int) -> bool:
+    try:
+        return httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200
+    except httpx.TransportError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of serve.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{directory}/memory.db", RATE_LIMIT_ENABLED="0")
+        subprocess.check_call([sys.executable, "-m", "app.migrate"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for workers in args.workers:
+            for preload in (True, False):
+                result = measure(workers, preload, env)
+                results.append(result)
+                print(f"workers {workers:3}  preload {'yes' if preload else 'no ':3}  "
+                      f"worker RSS {result['mean_worker_rss_kb'] / 1024:7.1f} MiB  "
+                      f"worker PSS {result['mean_worker_pss_kb'] / 1024:7.1f} MiB  "
+                      f"total PSS {result['total_pss_kb'] / 1024:8.1f} MiB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"revision": git_revision()}, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""add (url_id, clicked_at, id) index to clicks
+
+Revision ID: add_clicks_url_clicked_at_index
+Revises: add_share_token_column
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_clicks_url_clicked_at_index'
+down_revision = 'add_share_token_column'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_clicks_url_id_clicked_at_id', 'clicks', ['url_id', 'clicked_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_clicks_url_id_clicked_at_id', table_name='clicks')
@@ -0,0 +1,41 @@
+"""add ON DELETE CASCADE to clicks.url_id
+
+Revision ID: add_clicks_url_id_on_delete_cascade
+Revises: add_clicks_url_clicked_at_index
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_clicks_url_id_on_delete_cascade'
+down_revision = 'add_clicks_url_clicked_at_index'
+branch_labels = None
+depends_on = None
+
+# The original foreign key was created unnamed; give it a predictable name
+# so batch mode can drop it when SQLite recreates the table
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+
+def _replace_url_fk(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('clicks', naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('fk_clicks_url_id_urls', type_='foreignkey')
+            batch_op.create_foreign_key('fk_clicks_url_id_urls', 'urls', ['url_id'], ['id'], ondelete=ondelete)
+    else:
+        # PostgreSQL default name for the unnamed constraint
+        op.drop_constraint('clicks_url_id_fkey', 'clicks', type_='foreignkey')
+        op.create_foreign_key('clicks_url_id_fkey', 'clicks', 'urls', ['url_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_url_fk('CASCADE')
+
+
+def downgrade():
+    _replace_url_fk(None)
@@ -15,9 +15,19 @@ branch_labels = None
 depends_on = None
 
 def upgrade():
-    # The column and table apparently already exist in the database
-    # Let's just mark this migration as complete and move on
-    pass
+    # Databases created by Base.metadata.create_all already have the column
+    # and table; only add them when upgrading from the initial revision
+    inspector = sa.inspect(op.get_bind())
+    if 'is_admin' not in [column['name'] for column in inspector.get_columns('users')]:
+        op.add_column('users', sa.Column('is_admin', sa.Integer(), nullable=True))
+    if not inspector.has_table('site_settings'):
+        op.create_table('site_settings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('registration_enabled', sa.Boolean(), nullable=True),
+            sa.Column('last_updated', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_site_settings_id'), 'site_settings', ['id'], unique=False)
 
 def downgrade():
     op.drop_index(op.f('ix_site_settings_id'), table_name='site_settings')
@@ -0,0 +1,32 @@
+"""add redirect status and cache settings to urls and site_settings
+
+Revision ID: add_redirect_settings
+Revises: add_urls_bot_hits
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_redirect_settings'
+down_revision = 'add_urls_bot_hits'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('urls', sa.Column('redirect_status_code', sa.Integer(), nullable=True))
+    op.add_column('urls', sa.Column('redirect_cache_max_age', sa.Integer(), nullable=True))
+    op.add_column('site_settings', sa.Column('redirect_status_code', sa.Integer(), nullable=False, server_default='307'))
+    op.add_column('site_settings', sa.Column('redirect_cache_max_age', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('site_settings') as batch_op:
+        batch_op.drop_column('redirect_cache_max_age')
+        batch_op.drop_column('redirect_status_code')
+    with op.batch_alter_table('urls') as batch_op:
+        batch_op.drop_column('redirect_cache_max_age')
+        batch_op.drop_column('redirect_status_code')
@@ -0,0 +1,25 @@
+"""add bot_hits counter to urls
+
+Revision ID: add_urls_bot_hits
+Revises: dictionary_encode_click_dimensions
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_urls_bot_hits'
+down_revision = 'dictionary_encode_click_dimensions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('urls', sa.Column('bot_hits', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('urls') as batch_op:
+        batch_op.drop_column('bot_hits')
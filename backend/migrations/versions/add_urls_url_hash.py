@@ -0,0 +1,30 @@
+"""add url_hash to urls for per-user deduplication
+
+Revision ID: add_urls_url_hash
+Revises: add_urls_user_id_index
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_urls_url_hash'
+down_revision = 'add_urls_user_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('urls', sa.Column('url_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_urls_user_id_url_hash', 'urls', ['user_id', 'url_hash'], unique=True)
+    # Nothing looks links up by the full URL string any more
+    op.drop_index('ix_urls_original_url', table_name='urls')
+
+
+def downgrade():
+    op.create_index('ix_urls_original_url', 'urls', ['original_url'], unique=False)
+    op.drop_index('ix_urls_user_id_url_hash', table_name='urls')
+    with op.batch_alter_table('urls') as batch_op:
+        batch_op.drop_column('url_hash')
@@ -0,0 +1,24 @@
+"""add index on urls.user_id
+
+Revision ID: add_urls_user_id_index
+Revises: add_redirect_settings
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_urls_user_id_index'
+down_revision = 'add_redirect_settings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_urls_user_id'), 'urls', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_urls_user_id'), table_name='urls')
@@ -0,0 +1,84 @@
+"""dictionary-encode click dimensions
+
+Revision ID: dictionary_encode_click_dimensions
+Revises: partition_clicks_by_month
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dictionary_encode_click_dimensions'
+down_revision = 'partition_clicks_by_month'
+branch_labels = None
+depends_on = None
+
+# lookup table -> (clicks text column, clicks foreign key column)
+DIMENSIONS = {
+    'referrers': ('referrer', 'referrer_id'),
+    'user_agents': ('user_agent', 'user_agent_id'),
+    'operating_systems': ('operating_system', 'operating_system_id'),
+    'locations': ('location', 'location_id'),
+}
+
+
+def upgrade():
+    for table in ('referrers', 'user_agents', 'operating_systems'):
+        op.create_table(table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('value', sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('value')
+        )
+    op.create_table('locations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=True),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('value')
+    )
+
+    # Intern every distinct value already recorded
+    for table in ('referrers', 'user_agents', 'operating_systems'):
+        column = DIMENSIONS[table][0]
+        op.execute(f"INSERT INTO {table} (value) SELECT DISTINCT {column} FROM clicks WHERE {column} IS NOT NULL")
+    op.execute(
+        "INSERT INTO locations (value, country, city) "
+        "SELECT location, max(country), max(city) FROM clicks WHERE location IS NOT NULL GROUP BY location"
+    )
+
+    with op.batch_alter_table('clicks') as batch_op:
+        for table, (_, foreign_key) in DIMENSIONS.items():
+            batch_op.add_column(sa.Column(foreign_key, sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(f'fk_clicks_{foreign_key}_{table}', table, [foreign_key], ['id'])
+
+    for table, (column, foreign_key) in DIMENSIONS.items():
+        op.execute(f"UPDATE clicks SET {foreign_key} = (SELECT id FROM {table} WHERE {table}.value = clicks.{column})")
+
+    # client_host always held the same value as ip_address
+    with op.batch_alter_table('clicks') as batch_op:
+        for column in ('referrer', 'user_agent', 'operating_system', 'location', 'country', 'city', 'client_host'):
+            batch_op.drop_column(column)
+
+
+def downgrade():
+    with op.batch_alter_table('clicks') as batch_op:
+        for column in ('referrer', 'user_agent', 'operating_system', 'location', 'country', 'city', 'client_host'):
+            batch_op.add_column(sa.Column(column, sa.String(), nullable=True))
+
+    for table, (column, foreign_key) in DIMENSIONS.items():
+        op.execute(f"UPDATE clicks SET {column} = (SELECT value FROM {table} WHERE {table}.id = clicks.{foreign_key})")
+    op.execute("UPDATE clicks SET country = (SELECT country FROM locations WHERE locations.id = clicks.location_id)")
+    op.execute("UPDATE clicks SET city = (SELECT city FROM locations WHERE locations.id = clicks.location_id)")
+    op.execute("UPDATE clicks SET client_host = ip_address")
+
+    with op.batch_alter_table('clicks') as batch_op:
+        for table, (_, foreign_key) in DIMENSIONS.items():
+            batch_op.drop_constraint(f'fk_clicks_{foreign_key}_{table}', type_='foreignkey')
+            batch_op.drop_column(foreign_key)
+
+    for table in DIMENSIONS:
+        op.drop_table(table)
@@ -0,0 +1,107 @@
+"""partition clicks by month and add click_rollups
+
+Revision ID: partition_clicks_by_month
+Revises: add_clicks_url_id_on_delete_cascade
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_clicks_by_month'
+down_revision = 'add_clicks_url_id_on_delete_cascade'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month; the running app keeps
+# creating new ones as time moves on
+MONTHS_AHEAD = 2
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_clicks():
+    """Rebuild clicks as a PostgreSQL table partitioned by clicked_at month"""
+    bind = op.get_bind()
+    op.execute("ALTER TABLE clicks RENAME TO clicks_unpartitioned")
+    op.execute("ALTER INDEX clicks_pkey RENAME TO clicks_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE clicks_id_seq OWNED BY NONE")
+    op.execute("UPDATE clicks_unpartitioned SET clicked_at = now() AT TIME ZONE 'utc' WHERE clicked_at IS NULL")
+    op.execute("""
+        CREATE TABLE clicks (
+            LIKE clicks_unpartitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id, clicked_at),
+            CONSTRAINT clicks_url_id_fkey FOREIGN KEY (url_id) REFERENCES urls (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (clicked_at)
+    """)
+    op.execute("CREATE TABLE clicks_default PARTITION OF clicks DEFAULT")
+
+    oldest = bind.execute(sa.text("SELECT min(clicked_at) FROM clicks_unpartitioned")).scalar()
+    now = datetime.utcnow()
+    month = date((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE clicks_y{month.year:04d}m{month.month:02d} PARTITION OF clicks "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute("INSERT INTO clicks SELECT * FROM clicks_unpartitioned")
+    op.execute("DROP TABLE clicks_unpartitioned")
+    op.execute("ALTER SEQUENCE clicks_id_seq OWNED BY clicks.id")
+    op.create_index('ix_clicks_id', 'clicks', ['id'], unique=False)
+    op.create_index('ix_clicks_url_id_clicked_at_id', 'clicks', ['url_id', 'clicked_at', 'id'], unique=False)
+
+
+def _unpartition_clicks():
+    op.execute("ALTER TABLE clicks RENAME TO clicks_partitioned")
+    op.execute("ALTER INDEX clicks_pkey RENAME TO clicks_partitioned_pkey")
+    op.execute("ALTER SEQUENCE clicks_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE clicks (
+            LIKE clicks_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id),
+            CONSTRAINT clicks_url_id_fkey FOREIGN KEY (url_id) REFERENCES urls (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("INSERT INTO clicks SELECT * FROM clicks_partitioned")
+    op.execute("DROP TABLE clicks_partitioned")
+    op.execute("ALTER SEQUENCE clicks_id_seq OWNED BY clicks.id")
+    op.create_index('ix_clicks_id', 'clicks', ['id'], unique=False)
+    op.create_index('ix_clicks_url_id_clicked_at_id', 'clicks', ['url_id', 'clicked_at', 'id'], unique=False)
+
+
+def upgrade():
+    op.create_table('click_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('dimension', sa.String(length=32), nullable=False),
+        sa.Column('value', sa.String(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_click_rollups_id'), 'click_rollups', ['id'], unique=False)
+    op.create_index('ix_click_rollups_url_id_day', 'click_rollups', ['url_id', 'day'], unique=False)
+
+    # SQLite keeps a single clicks table; the (url_id, clicked_at, id) index
+    # bounds time range scans there
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_clicks()
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_clicks()
+
+    op.drop_index('ix_click_rollups_url_id_day', table_name='click_rollups')
+    op.drop_index(op.f('ix_click_rollups_id'), table_name='click_rollups')
+    op.drop_table('click_rollups')
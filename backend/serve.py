@@ -0,0 +1,112 @@
+"""
+Pre-fork multi-worker server.
+
+The app, the user agent parser tables and the GeoIP database are loaded once
+in the parent before forking, so workers share those pages copy-on-write
+instead of each holding its own copy:
+
+    python serve.py --workers 4 --port 8000
+
+Workers that exit unexpectedly are restarted; SIGTERM or SIGINT stops all.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+def load_app(preload: bool):
+    from app.main import app
+
+    if preload:
+        from app import enrichment
+
+        enrichment.preload()
+    return app
+
+def run_worker(sock: socket.socket, args, app=None):
+    # Workers handle their own signals through uvicorn
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if app is None:
+        app = load_app(preload=False)
+
+    # Never reuse database connections opened before the fork
+    from app.database import engine, read_engine
+    engine.dispose()
+    read_engine.dispose()
+
+    config = uvicorn.Config(app, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ShortURL with pre-forked uvicorn workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="load the app in each worker after forking instead of once in the parent")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    app = None
+    if args.preload:
+        app = load_app(preload=True)
+        # Keep the garbage collector from touching, and so copying, the
+        # preloaded objects in every worker
+        gc.freeze()
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, args, app)
+            finally:
+                os._exit(0)
+        workers.add(pid)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"Started {args.workers} workers on {args.host}:{args.port} (parent {os.getpid()})", flush=True)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr, flush=True)
+            time.sleep(0.1)
+            spawn()
+
+if __name__ == "__main__":
+    main()